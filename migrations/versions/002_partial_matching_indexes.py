@@ -0,0 +1,49 @@
+"""Partial indexes for the matcher's candidate queries.
+
+* ``idx_cabs_loc_available`` -- GIST on ``geography(current_location)``
+  restricted to available cabs.  Serves the nearest-cab lookup
+  (``ST_DWithin`` on geography + ``<->`` KNN) without touching busy cabs,
+  and makes the plain ``idx_cabs_available`` B-Tree redundant.
+* ``idx_rides_pending`` -- B-Tree on ``created_at`` for PENDING rides only,
+  matching the FIFO sweep ``WHERE status = 'PENDING' ORDER BY created_at``.
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "002"
+down_revision = "001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "idx_cabs_loc_available",
+        "cabs",
+        [sa.text("geography(current_location)")],
+        postgresql_using="gist",
+        postgresql_where=sa.text("is_available"),
+    )
+    op.drop_index("idx_cabs_available", table_name="cabs")
+
+    op.create_index(
+        "idx_rides_pending",
+        "rides",
+        ["created_at"],
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+
+    op.execute("ANALYZE cabs")
+    op.execute("ANALYZE rides")
+
+
+def downgrade() -> None:
+    op.drop_index("idx_rides_pending", table_name="rides")
+    op.create_index("idx_cabs_available", "cabs", ["is_available"])
+    op.drop_index("idx_cabs_loc_available", table_name="cabs")
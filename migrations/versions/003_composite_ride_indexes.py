@@ -0,0 +1,45 @@
+"""Composite B-Tree indexes on rides.
+
+* ``idx_rides_status_created`` -- ``(status, created_at)`` replaces the
+  single-column ``idx_rides_status``: status-only filters still use its
+  prefix, and ``WHERE status = ? ORDER BY created_at`` becomes an ordered
+  index scan with no sort for every status.  The PENDING sweep is served
+  by ``idx_rides_pending_cell`` (migration 004) and this index.
+* ``idx_rides_group_status`` -- ``(ride_group_id, status)`` replaces
+  ``idx_rides_group`` so the group's live-ride check in the cancellation
+  flow (``ride_group_id = ? AND status NOT IN (...)``) filters inside
+  the index instead of on heap rows.
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+
+
+revision = "003"
+down_revision = "002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "idx_rides_status_created", "rides", ["status", "created_at"]
+    )
+    op.drop_index("idx_rides_status", table_name="rides")
+
+    op.create_index(
+        "idx_rides_group_status", "rides", ["ride_group_id", "status"]
+    )
+    op.drop_index("idx_rides_group", table_name="rides")
+
+    op.execute("ANALYZE rides")
+
+
+def downgrade() -> None:
+    op.create_index("idx_rides_group", "rides", ["ride_group_id"])
+    op.drop_index("idx_rides_group_status", table_name="rides")
+    op.create_index("idx_rides_status", "rides", ["status"])
+    op.drop_index("idx_rides_status_created", table_name="rides")
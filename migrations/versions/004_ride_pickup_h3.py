@@ -0,0 +1,61 @@
+"""Store each ride's pickup H3 cell.
+
+* ``rides.pickup_h3`` -- H3 cell of the pickup at ``H3_RESOLUTION``,
+  written on insert so the matcher bins pending rides without any H3
+  calls.  Existing PENDING rides are backfilled here; older rides keep
+  NULL (the matcher bins any NULL stragglers in Python).
+* ``idx_rides_pending_cell`` -- partial B-Tree on
+  ``(pickup_h3, created_at)`` for PENDING rides, matching the matcher's
+  ``ORDER BY pickup_h3, created_at`` sweep.
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+import h3
+import sqlalchemy as sa
+
+from src.config import settings
+
+
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("rides", sa.Column("pickup_h3", sa.String(20), nullable=True))
+
+    bind = op.get_bind()
+    pending = bind.execute(
+        sa.text(
+            "SELECT id, pickup_lat, pickup_lng FROM rides WHERE status = 'PENDING'"
+        )
+    ).all()
+    if pending:
+        bind.execute(
+            sa.text("UPDATE rides SET pickup_h3 = :cell WHERE id = :id"),
+            [
+                {
+                    "id": ride_id,
+                    "cell": h3.latlng_to_cell(lat, lng, settings.h3_resolution),
+                }
+                for ride_id, lat, lng in pending
+            ],
+        )
+
+    op.create_index(
+        "idx_rides_pending_cell",
+        "rides",
+        ["pickup_h3", "created_at"],
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+    op.execute("ANALYZE rides")
+
+
+def downgrade() -> None:
+    op.drop_index("idx_rides_pending_cell", table_name="rides")
+    op.drop_column("rides", "pickup_h3")
@@ -0,0 +1,36 @@
+"""Geography index on MATCHED rides' pickups for candidate-group lookup.
+
+* ``idx_rides_pickup_matched`` -- partial GIST on
+  ``geography(pickup_point)`` for MATCHED rides.  Serves the matcher's
+  ``ST_DWithin`` + ``<->`` search for groups near a cell; the plain
+  ``idx_rides_pickup`` is on geometry and cannot serve geography
+  predicates.
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "idx_rides_pickup_matched",
+        "rides",
+        [sa.text("geography(pickup_point)")],
+        postgresql_using="gist",
+        postgresql_where=sa.text("status = 'MATCHED'"),
+    )
+    op.execute("ANALYZE rides")
+
+
+def downgrade() -> None:
+    op.drop_index("idx_rides_pickup_matched", table_name="rides")
@@ -0,0 +1,35 @@
+"""Drop the unused FIFO partial index on pending rides.
+
+* ``idx_rides_pending`` -- partial B-Tree on ``created_at`` for PENDING
+  rides.  Its only reader, the global ``ORDER BY created_at`` sweep, is
+  gone: the matcher reads pending rides per cell through
+  ``idx_rides_pending_cell (pickup_h3, created_at)``, and
+  ``idx_rides_status_created`` covers any remaining status + age filter.
+  Dropping it saves a write on every ride insert and status change.
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.drop_index("idx_rides_pending", table_name="rides")
+
+
+def downgrade() -> None:
+    op.create_index(
+        "idx_rides_pending",
+        "rides",
+        ["created_at"],
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
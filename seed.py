@@ -4,6 +4,10 @@ Seed script -- populates the database with sample data for reviewers.
 Run after migrations:
     python seed.py
 
+Users and rides are loaded with binary COPY (``copy_records_to_table``);
+cabs and groups use a single executemany INSERT ... RETURNING each since
+their generated ids are needed by later rows.
+
 Creates:
   - 10 sample users
   - 15 sample cabs (spread around Mumbai airport area)
@@ -12,10 +16,11 @@ Creates:
 """
 
 import asyncio
+import struct
 import sys
 
-from sqlalchemy import text
-from geoalchemy2.functions import ST_MakePoint
+from geoalchemy2 import WKTElement
+from sqlalchemy import insert, select, text
 
 from src.config import settings
 from src.infrastructure.database import async_session_factory, engine
@@ -26,6 +31,7 @@ from src.infrastructure.models import (
     UserModel,
 )
 from src.domain.enums import RideStatus, VehicleType
+from src.domain.matching import ride_h3_cell
 
 # Mumbai airport coordinates (approx)
 AIRPORT_LAT, AIRPORT_LNG = 19.0896, 72.8656
@@ -67,6 +73,45 @@ CABS = [
 ]
 
 
+# Cabs (by index into CABS) pre-assigned to the two sample ride groups
+GROUP_CAB_INDEXES = (0, 5)
+
+
+def _wkt(lat: float, lng: float) -> WKTElement:
+    """SRID-4326 point built once in Python; bound as a single text parameter."""
+    return WKTElement(f"POINT({lng} {lat})", srid=4326)
+
+
+def _ewkb(lat: float, lng: float) -> bytes:
+    """Little-endian EWKB for an SRID-4326 point (PostGIS binary input)."""
+    return struct.pack("<BIIdd", 1, 0x20000001, 4326, lng, lat)
+
+
+async def _copy_connection(session):
+    """
+    The session's underlying asyncpg connection (same transaction), with
+    ``geometry`` accepting pre-encoded EWKB in binary COPY.
+    """
+    conn = await session.connection()
+    raw = (await conn.get_raw_connection()).driver_connection
+    await raw.set_type_codec(
+        "geometry",
+        schema="public",
+        encoder=bytes,
+        decoder=bytes,
+        format="binary",
+    )
+    return raw
+
+
+async def _bulk_insert(session, model, rows: list[dict]) -> list[int]:
+    """Insert *rows* in one executemany round-trip; return ids in input order."""
+    result = await session.execute(
+        insert(model).returning(model.id, sort_by_parameter_order=True), rows
+    )
+    return list(result.scalars().all())
+
+
 async def seed():
     async with async_session_factory() as session:
         # Check if already seeded
@@ -75,99 +120,107 @@ async def seed():
             print("Database already seeded. Skipping.")
             return
 
-        # ── Users ─────────────────────────────────────────────────────
-        user_models = []
-        for u in USERS:
-            m = UserModel(name=u["name"], email=u["email"], rating=u["rating"])
-            session.add(m)
-            user_models.append(m)
-        await session.flush()
-        print(f"  Created {len(user_models)} users")
+        copy_conn = await _copy_connection(session)
+
+        # ── Users (COPY; ids looked up by unique email) ───────────────
+        await copy_conn.copy_records_to_table(
+            UserModel.__tablename__,
+            records=[(u["name"], u["email"], u["rating"]) for u in USERS],
+            columns=["name", "email", "rating"],
+        )
+        result = await session.execute(select(UserModel.email, UserModel.id))
+        ids_by_email = dict(result.all())
+        user_ids = [ids_by_email[u["email"]] for u in USERS]
+        print(f"  Created {len(user_ids)} users")
 
         # ── Cabs ──────────────────────────────────────────────────────
-        cab_models = []
-        for c in CABS:
-            m = CabModel(
-                vehicle_type=c["vehicle_type"],
-                max_seats=c["max_seats"],
-                max_luggage=c["max_luggage"],
-                current_location=ST_MakePoint(c["lng"], c["lat"]),
-                is_available=True,
-            )
-            session.add(m)
-            cab_models.append(m)
-        await session.flush()
-        print(f"  Created {len(cab_models)} cabs")
+        cab_ids = await _bulk_insert(
+            session,
+            CabModel,
+            [
+                {
+                    "vehicle_type": c["vehicle_type"],
+                    "max_seats": c["max_seats"],
+                    "max_luggage": c["max_luggage"],
+                    "current_location": _wkt(c["lat"], c["lng"]),
+                    # Cabs assigned to the sample groups start unavailable
+                    "is_available": i not in GROUP_CAB_INDEXES,
+                }
+                for i, c in enumerate(CABS)
+            ],
+        )
+        print(f"  Created {len(cab_ids)} cabs")
 
         # ── Ride Groups (pre-matched examples) ────────────────────────
-        group1 = RideGroupModel(
-            cab_id=cab_models[0].id,
-            seats_occupied=2,
-            luggage_occupied=2,
-            status="ACTIVE",
-            h3_cell="872a1072bffffff",  # example H3 cell near Mumbai
+        group1_id, group2_id = await _bulk_insert(
+            session,
+            RideGroupModel,
+            [
+                {
+                    "cab_id": cab_ids[GROUP_CAB_INDEXES[0]],
+                    "seats_occupied": 2,
+                    "luggage_occupied": 2,
+                    "status": "ACTIVE",
+                    "h3_cell": "872a1072bffffff",  # example H3 cell near Mumbai
+                },
+                {
+                    "cab_id": cab_ids[GROUP_CAB_INDEXES[1]],
+                    "seats_occupied": 3,
+                    "luggage_occupied": 3,
+                    "status": "ACTIVE",
+                    "h3_cell": "872a1072bffffff",
+                },
+            ],
         )
-        group2 = RideGroupModel(
-            cab_id=cab_models[5].id,
-            seats_occupied=3,
-            luggage_occupied=3,
-            status="ACTIVE",
-            h3_cell="872a1072bffffff",
-        )
-        session.add_all([group1, group2])
-        await session.flush()
-        # Mark assigned cabs as unavailable
-        cab_models[0].is_available = False
-        cab_models[5].is_available = False
         print("  Created 2 ride groups")
 
         # ── Rides ─────────────────────────────────────────────────────
         rides_data = [
             # Group 1 rides (MATCHED)
             {
-                "user_id": user_models[0].id,
+                "user_id": user_ids[0],
                 "pickup": (19.0896, 72.8656),  # Airport
                 "dropoff": (19.0760, 72.8777),  # Andheri
                 "status": RideStatus.MATCHED,
                 "seats": 1, "luggage": 1,
-                "group_id": group1.id, "price": 120.50,
+                "group_id": group1_id, "price": 120.50,
             },
             {
-                "user_id": user_models[1].id,
+                "user_id": user_ids[1],
                 "pickup": (19.0890, 72.8650),
                 "dropoff": (19.0730, 72.8800),  # Andheri East
                 "status": RideStatus.MATCHED,
                 "seats": 1, "luggage": 1,
-                "group_id": group1.id, "price": 105.20,
+                "group_id": group1_id, "price": 105.20,
             },
             # Group 2 rides (MATCHED)
             {
-                "user_id": user_models[2].id,
+                "user_id": user_ids[2],
                 "pickup": (19.0900, 72.8660),
                 "dropoff": (19.1176, 72.9060),  # Powai
                 "status": RideStatus.MATCHED,
                 "seats": 1, "luggage": 1,
-                "group_id": group2.id, "price": 180.00,
+                "group_id": group2_id, "price": 180.00,
             },
             {
-                "user_id": user_models[3].id,
+                "user_id": user_ids[3],
                 "pickup": (19.0895, 72.8655),
                 "dropoff": (19.1136, 72.9000),  # near Powai
                 "status": RideStatus.MATCHED,
                 "seats": 1, "luggage": 1,
-                "group_id": group2.id, "price": 150.40,
+                "group_id": group2_id, "price": 150.40,
             },
             {
-                "user_id": user_models[4].id,
+                "user_id": user_ids[4],
                 "pickup": (19.0892, 72.8652),
                 "dropoff": (19.1200, 72.9100),  # IIT Bombay
                 "status": RideStatus.MATCHED,
                 "seats": 1, "luggage": 1,
-                "group_id": group2.id, "price": 140.00,
+                "group_id": group2_id, "price": 140.00,
             },
             # PENDING rides (waiting to be matched)
             {
-                "user_id": user_models[5].id,
+                "user_id": user_ids[5],
                 "pickup": (19.0888, 72.8648),
                 "dropoff": (19.0540, 72.8400),  # Bandra
                 "status": RideStatus.PENDING,
@@ -175,7 +228,7 @@ async def seed():
                 "group_id": None, "price": None,
             },
             {
-                "user_id": user_models[6].id,
+                "user_id": user_ids[6],
                 "pickup": (19.0902, 72.8662),
                 "dropoff": (19.0600, 72.8500),  # Santacruz
                 "status": RideStatus.PENDING,
@@ -184,7 +237,7 @@ async def seed():
             },
             # COMPLETED ride
             {
-                "user_id": user_models[7].id,
+                "user_id": user_ids[7],
                 "pickup": (19.0896, 72.8656),
                 "dropoff": (19.0200, 72.8500),  # Dadar
                 "status": RideStatus.COMPLETED,
@@ -193,23 +246,43 @@ async def seed():
             },
         ]
 
-        for r in rides_data:
-            ride = RideModel(
-                user_id=r["user_id"],
-                pickup_lat=r["pickup"][0],
-                pickup_lng=r["pickup"][1],
-                dropoff_lat=r["dropoff"][0],
-                dropoff_lng=r["dropoff"][1],
-                pickup_point=ST_MakePoint(r["pickup"][1], r["pickup"][0]),
-                dropoff_point=ST_MakePoint(r["dropoff"][1], r["dropoff"][0]),
-                status=r["status"],
-                seats_requested=r["seats"],
-                luggage_count=r["luggage"],
-                ride_group_id=r["group_id"],
-                price=r["price"],
-            )
-            session.add(ride)
-        await session.flush()
+        # Leaf table, no ids needed back -> binary COPY
+        await copy_conn.copy_records_to_table(
+            RideModel.__tablename__,
+            records=[
+                (
+                    r["user_id"],
+                    r["pickup"][0],
+                    r["pickup"][1],
+                    r["dropoff"][0],
+                    r["dropoff"][1],
+                    _ewkb(*r["pickup"]),
+                    _ewkb(*r["dropoff"]),
+                    r["status"].value,
+                    r["seats"],
+                    r["luggage"],
+                    r["group_id"],
+                    r["price"],
+                    ride_h3_cell(*r["pickup"], settings.h3_resolution),
+                )
+                for r in rides_data
+            ],
+            columns=[
+                "user_id",
+                "pickup_lat",
+                "pickup_lng",
+                "dropoff_lat",
+                "dropoff_lng",
+                "pickup_point",
+                "dropoff_point",
+                "status",
+                "seats_requested",
+                "luggage_count",
+                "ride_group_id",
+                "price",
+                "pickup_h3",
+            ],
+        )
         print(f"  Created {len(rides_data)} rides")
 
         await session.commit()
@@ -3,10 +3,12 @@ FastAPI application factory.
 
 * Registers routes for rides and admin.
 * Starts / stops the background matching worker via lifespan events.
+* Warms the Numba distance kernel on startup (off the event loop).
 * Applies rate-limiting middleware.
 * Swagger / OpenAPI UI available at ``/docs``.
 """
 
+import asyncio
 from contextlib import asynccontextmanager
 import logging
 
@@ -16,6 +18,7 @@ from slowapi.errors import RateLimitExceeded
 
 from src.api.middleware import limiter
 from src.api.routes import admin, rides
+from src.domain import distance_nb, matching_nb
 from src.workers import matcher as _matcher
 
 logging.basicConfig(level=logging.INFO)
@@ -24,6 +27,8 @@ logging.basicConfig(level=logging.INFO)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Start the matching worker on startup; stop on shutdown."""
+    await asyncio.to_thread(distance_nb.warm_up)
+    await asyncio.to_thread(matching_nb.warm_up)
     await _matcher.start_matching_loop()
     yield
     await _matcher.stop_matching_loop()
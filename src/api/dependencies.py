@@ -2,11 +2,19 @@
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.infrastructure.cache import RideCache
 from src.infrastructure.database import async_session_factory
+from src.infrastructure.redis_client import get_redis
 
 
 async def get_db() -> AsyncSession:  # type: ignore[misc]
-    """Yield an async DB session; commit on success, rollback on error."""
+    """
+    Yield an async DB session; commit on success, rollback on error.
+
+    Routes declare it with ``scope="function"`` so the commit and the
+    connection release happen as soon as the handler returns -- before
+    response serialisation -- and commit errors still reach the client.
+    """
     async with async_session_factory() as session:
         try:
             yield session
@@ -14,3 +22,8 @@ async def get_db() -> AsyncSession:  # type: ignore[misc]
         except Exception:
             await session.rollback()
             raise
+
+
+async def get_ride_cache() -> RideCache:
+    """Return the Redis-backed ride status cache."""
+    return RideCache(await get_redis())
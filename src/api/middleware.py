@@ -1,6 +1,21 @@
-"""Rate-limiting middleware (100 req/min default)."""
+"""
+Rate-limiting middleware (100 req/min default).
+
+Counters live in Redis so the limit holds across every uvicorn worker
+and API replica (in-memory storage would give each process its own
+budget).  If Redis is unreachable the limiter falls back to per-process
+memory rather than failing requests.
+"""
 
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-limiter = Limiter(key_func=get_remote_address, default_limits=["100/minute"])
+from src.config import settings
+
+limiter = Limiter(
+    key_func=get_remote_address,
+    default_limits=["100/minute"],
+    storage_uri=settings.rate_limit_storage_uri or settings.redis_url,
+    strategy="moving-window",
+    in_memory_fallback_enabled=True,
+)
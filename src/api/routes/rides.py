@@ -9,18 +9,15 @@ PATCH /api/v1/rides/{ride_id}/cancel -- cancel a ride
 
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.dependencies import get_db
+from src.api.dependencies import get_db, get_ride_cache
 from src.api.middleware import limiter
 from src.api.schemas import RideCreateRequest, RideResponse
-from src.domain.enums import RIDE_TRANSITIONS, RideStatus
-from src.infrastructure.repositories import (
-    CabRepository,
-    RideGroupRepository,
-    RideRepository,
-)
+from src.domain.entities import InvalidStateTransition
+from src.infrastructure.cache import RideCache
+from src.infrastructure.repositories import RideRepository
 
 router = APIRouter(prefix="/rides", tags=["rides"])
 
@@ -36,17 +33,10 @@ router = APIRouter(prefix="/rides", tags=["rides"])
 async def create_ride(
     request: Request,
     body: RideCreateRequest,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
 ):
-    repo = RideRepository(db)
-
-    # ── Idempotency guard ─────────────────────────────────────────
-    if body.idempotency_key:
-        existing = await repo.get_by_idempotency_key(body.idempotency_key)
-        if existing:
-            return existing
-
-    ride = await repo.create_ride(
+    # Idempotent: a repeated idempotency_key returns the original ride
+    ride = await RideRepository(db).create_ride(
         user_id=body.user_id,
         pickup_lat=body.pickup_lat,
         pickup_lng=body.pickup_lng,
@@ -68,12 +58,19 @@ async def create_ride(
 async def get_ride(
     request: Request,
     ride_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
+    cache: RideCache = Depends(get_ride_cache),
 ):
-    ride = await RideRepository(db).get_by_id(ride_id)
+    cached = await cache.get(ride_id)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
+    ride = await RideRepository(db).get_response_by_id(ride_id)
     if not ride:
         raise HTTPException(status_code=404, detail="Ride not found")
-    return ride
+    response = RideResponse.model_validate(ride)
+    await cache.set(ride_id, response.model_dump(mode="json"))
+    return response
 
 
 @router.patch(
@@ -89,47 +86,18 @@ async def get_ride(
 async def cancel_ride(
     request: Request,
     ride_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
+    cache: RideCache = Depends(get_ride_cache),
 ):
-    ride_repo = RideRepository(db)
-    group_repo = RideGroupRepository(db)
-
-    ride = await ride_repo.get_by_id(ride_id)
+    try:
+        ride = await RideRepository(db).cancel(ride_id)
+    except InvalidStateTransition as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
     if not ride:
         raise HTTPException(status_code=404, detail="Ride not found")
 
-    allowed = RIDE_TRANSITIONS.get(RideStatus(ride.status), set())
-    if RideStatus.CANCELLED not in allowed:
-        raise HTTPException(
-            status_code=409,
-            detail=f"Cannot cancel ride in status {ride.status}",
-        )
-
-    # Free group capacity if the ride was matched
-    if ride.ride_group_id:
-        group = await group_repo.get_by_id(ride.ride_group_id)
-        if group:
-            group.seats_occupied = max(
-                0, group.seats_occupied - ride.seats_requested
-            )
-            group.luggage_occupied = max(
-                0, group.luggage_occupied - ride.luggage_count
-            )
-            # If no active rides remain, deactivate group & free cab
-            remaining = await ride_repo.get_rides_in_group(group.id)
-            active = [
-                r
-                for r in remaining
-                if r.id != ride_id
-                and RideStatus(r.status) != RideStatus.CANCELLED
-            ]
-            if not active:
-                group.status = "INACTIVE"
-                if group.cab_id:
-                    cab = await CabRepository(db).get_by_id(group.cab_id)
-                    if cab:
-                        cab.is_available = True
-
-    ride.status = RideStatus.CANCELLED
-    ride.ride_group_id = None
+    # Commit before dropping the cached document: a GET arriving in
+    # between would otherwise re-cache the pre-cancel state for the TTL.
+    await db.commit()
+    await cache.invalidate(ride_id)
     return ride
@@ -3,9 +3,8 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, field_validator
 
 
 # ── Requests ──────────────────────────────────────────────────────────
@@ -19,12 +18,15 @@ class RideCreateRequest(BaseModel):
     dropoff_lng: float = Field(..., ge=-180, le=180)
     seats_requested: int = Field(1, ge=1, le=6)
     luggage_count: int = Field(0, ge=0, le=10)
-    idempotency_key: Optional[str] = Field(
+    idempotency_key: str | None = Field(
         None,
         max_length=64,
         description="Client-generated UUID to prevent double-booking on retries.",
     )
 
+    # Unknown fields are rejected outright (no per-request ``__dict__`` of extras)
+    model_config = ConfigDict(extra="forbid")
+
 
 # ── Responses ─────────────────────────────────────────────────────────
 
@@ -39,23 +41,29 @@ class RideResponse(BaseModel):
     status: str
     seats_requested: int
     luggage_count: int
-    ride_group_id: Optional[int] = None
-    price: Optional[float] = None
-    created_at: Optional[datetime] = None
+    ride_group_id: int | None = None
+    price: float | None = None
+    created_at: datetime | None = None
+
+    model_config = ConfigDict(from_attributes=True)
 
-    model_config = {"from_attributes": True}
+    @field_validator("status", mode="before")
+    @classmethod
+    def _status_value(cls, v):
+        """Accept ``RideStatus`` members (ORM rows) as well as raw strings."""
+        return v.value if hasattr(v, "value") else v
 
 
 class RideGroupResponse(BaseModel):
     id: int
-    cab_id: Optional[int] = None
+    cab_id: int | None = None
     seats_occupied: int
     luggage_occupied: int
     status: str
-    h3_cell: Optional[str] = None
+    h3_cell: str | None = None
     rides: list[RideResponse] = []
 
-    model_config = {"from_attributes": True}
+    model_config = ConfigDict(from_attributes=True)
 
 
 class HealthResponse(BaseModel):
@@ -64,3 +72,12 @@ class HealthResponse(BaseModel):
 
 class ErrorResponse(BaseModel):
     detail: str
+
+
+# Resolve the postponed annotations at import so the first request does
+# not pay for building the core validators and serialisers.
+RideResponse.model_rebuild()
+RideGroupResponse.model_rebuild()
+
+# Validates the admin listing's ORM groups in a single core call.
+RIDE_GROUP_LIST = TypeAdapter(list[RideGroupResponse])
@@ -8,11 +8,14 @@ We use great-circle (Haversine) distance instead of a real routing engine
 locally without external API keys.  In production this module would be
 replaced by a routing-service client that returns actual road distances.
 
-Complexity: O(1) per call.
+Complexity: O(1) per scalar call; ``haversine_km_array`` is O(size of
+the broadcast shape) but runs inside NumPy's C loops.
 """
 
 import math
 
+import numpy as np
+
 EARTH_RADIUS_KM = 6_371.0
 
 
@@ -29,3 +32,22 @@ def haversine_km(
         + math.cos(lat1_r) * math.cos(lat2_r) * math.sin(dlng / 2) ** 2
     )
     return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def haversine_km_array(lats1, lngs1, lats2, lngs2, dtype=np.float32) -> np.ndarray:
+    """
+    Distances in **km** between ``(lats1, lngs1)`` and ``(lats2, lngs2)``
+    under NumPy broadcasting: pass equal-length arrays for element-wise
+    pairs, a scalar against an array for one-to-many, or ``[:, None]`` /
+    ``[None, :]`` views for an ``[N, M]`` matrix.
+    """
+    lat1_r = np.radians(np.asarray(lats1, dtype=dtype))
+    lng1_r = np.radians(np.asarray(lngs1, dtype=dtype))
+    lat2_r = np.radians(np.asarray(lats2, dtype=dtype))
+    lng2_r = np.radians(np.asarray(lngs2, dtype=dtype))
+
+    a = (
+        np.sin((lat2_r - lat1_r) / 2) ** 2
+        + np.cos(lat1_r) * np.cos(lat2_r) * np.sin((lng2_r - lng1_r) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
@@ -49,7 +49,7 @@ class Ride:
 
     def transition_to(self, new_status: RideStatus) -> None:
         """Move to *new_status* if the transition is legal, else raise."""
-        allowed = RIDE_TRANSITIONS.get(self.status, set())
+        allowed = RIDE_TRANSITIONS.get(self.status, frozenset())
         if new_status not in allowed:
             raise InvalidStateTransition(
                 f"Cannot transition from {self.status} to {new_status}"
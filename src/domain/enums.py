@@ -12,14 +12,22 @@ class RideStatus(str, enum.Enum):
 
 
 # State machine: maps current status -> set of valid next statuses
-RIDE_TRANSITIONS: dict[RideStatus, set[RideStatus]] = {
-    RideStatus.PENDING: {RideStatus.MATCHED, RideStatus.CANCELLED},
-    RideStatus.MATCHED: {RideStatus.ON_TRIP, RideStatus.CANCELLED},
-    RideStatus.ON_TRIP: {RideStatus.COMPLETED},
-    RideStatus.COMPLETED: set(),
-    RideStatus.CANCELLED: set(),
+RIDE_TRANSITIONS: dict[RideStatus, frozenset[RideStatus]] = {
+    RideStatus.PENDING: frozenset({RideStatus.MATCHED, RideStatus.CANCELLED}),
+    RideStatus.MATCHED: frozenset({RideStatus.ON_TRIP, RideStatus.CANCELLED}),
+    RideStatus.ON_TRIP: frozenset({RideStatus.COMPLETED}),
+    RideStatus.COMPLETED: frozenset(),
+    RideStatus.CANCELLED: frozenset(),
 }
 
+# Raw status strings that may move to CANCELLED.  ``RideStatus`` is a str
+# enum, so both enum members and plain DB strings hit this set directly.
+CANCELLABLE_STATUSES: frozenset[str] = frozenset(
+    status.value
+    for status, allowed in RIDE_TRANSITIONS.items()
+    if RideStatus.CANCELLED in allowed
+)
+
 
 class VehicleType(str, enum.Enum):
     SEDAN = "SEDAN"
@@ -3,6 +3,9 @@ Windowed Spatial Batching Algorithm
 ====================================
 
 1. **Spatial Binning**   -- H3 hexagons at resolution 7 (~5.16 km²).
+   Candidate groups for a cell are the K nearest groups with a pickup
+   within a radius of the cell's rides (PostGIS ``ST_DWithin`` + KNN),
+   so groups just across a hexagon edge are still found.
 2. **Temporal Batching** -- Pending rides are buffered for a configurable
    window (default 15 s) before the matching engine runs.
 3. **Greedy Grouping**   -- Within each cell, iterate pending rides and
@@ -18,7 +21,7 @@ Complexity
 Let N = total pending rides, C = # H3 cells with rides,
     m_i = rides in cell i, g_i = active groups in cell i.
 
-* Binning:       O(N)                -- one H3 call per ride
+* Binning:       O(N)                -- one batched H3 pass
 * Grouping:      sum[ O(m_i x g_i) ] -- for each ride, scan groups
 * Worst-case:    O(N^2)              -- all rides in one cell, no matches
 * Expected:      O(N x G_avg)        -- G_avg << N with spatial binning
@@ -31,9 +34,10 @@ O(N x G_avg) runtime.
 
 from __future__ import annotations
 
-import h3
+from collections import defaultdict
+from itertools import repeat
 
-from .distance import haversine_km
+import h3
 
 
 def ride_h3_cell(lat: float, lng: float, resolution: int = 7) -> str:
@@ -41,62 +45,22 @@ def ride_h3_cell(lat: float, lng: float, resolution: int = 7) -> str:
     return h3.latlng_to_cell(lat, lng, resolution)
 
 
-def detour_ok(
-    existing_pickups: list[tuple[float, float]],
-    existing_dropoffs: list[tuple[float, float]],
-    new_pickup: tuple[float, float],
-    new_dropoff: tuple[float, float],
-    tolerance: float = 0.4,
-) -> bool:
+def ride_h3_cells(lats, lngs, resolution: int = 7) -> list[str]:
     """
-    Check whether adding a new stop keeps *every* passenger's detour
-    within ``(1 + tolerance) x direct_distance``.
-
-    Simplified model
-    ~~~~~~~~~~~~~~~~
-    The shared route visits all pickups in order then all drop-offs in
-    order.  For each passenger *i* the "shared leg" is the distance
-    along that route from pickup_i to dropoff_i.
+    Vectorised :func:`ride_h3_cell` for parallel coordinate sequences.
 
-    Complexity: O(k) where k = passengers already in the group.
+    h3-py 4.x has no array entry point, so this binds ``latlng_to_cell``
+    once and lets ``map`` drive the loop in C -- no per-ride wrapper call
+    or attribute lookup.  O(N).
     """
-    all_pickups = existing_pickups + [new_pickup]
-    all_dropoffs = existing_dropoffs + [new_dropoff]
-
-    for i, (p, d) in enumerate(zip(all_pickups, all_dropoffs)):
-        direct = haversine_km(p[0], p[1], d[0], d[1])
-        if direct < 0.1:  # negligible distance -- skip
-            continue
-
-        total_shared = _shared_leg(all_pickups, all_dropoffs, i)
-        if total_shared > (1 + tolerance) * direct:
-            return False
-
-    return True
+    return list(map(h3.latlng_to_cell, lats, lngs, repeat(resolution, len(lats))))
 
 
-def _shared_leg(
-    pickups: list[tuple[float, float]],
-    dropoffs: list[tuple[float, float]],
-    passenger_idx: int,
-) -> float:
-    """
-    Estimate the shared-route distance for passenger *passenger_idx*.
-
-    Sequential model: all pickups in index order, then all drop-offs.
-    The passenger's leg = sum of hops from their pickup position to
-    their drop-off position along the ordered stop list.
-
-    Complexity: O(k) where k = total stops.
-    """
-    stops = list(pickups) + list(dropoffs)
-    start_idx = passenger_idx
-    end_idx = len(pickups) + passenger_idx
-
-    total = 0.0
-    for j in range(start_idx, end_idx):
-        total += haversine_km(
-            stops[j][0], stops[j][1],
-            stops[j + 1][0], stops[j + 1][1],
-        )
-    return total
+def bin_rides_by_cell(rides, resolution: int = 7) -> dict[str, list]:
+    """Group ride objects by the H3 cell of their pickup point.  O(N)."""
+    lats = [r.pickup_lat for r in rides]
+    lngs = [r.pickup_lng for r in rides]
+    bins: dict[str, list] = defaultdict(list)
+    for ride, cell in zip(rides, ride_h3_cells(lats, lngs, resolution)):
+        bins[cell].append(ride)
+    return bins
@@ -0,0 +1,237 @@
+"""
+Compiled greedy grouping kernel over structure-of-arrays (SoA) columns.
+
+The matching worker packs one cell's pending rides and candidate groups
+into flat NumPy columns (:class:`CellBatch`) and lets the kernel run the
+seat / luggage capacity check and the per-passenger detour rule without
+touching ORM attributes.  This kernel is the only production definition
+of the detour rule (see :mod:`src.domain.matching` for its statement).
+Group routes are stored as ``[groups, max_passengers]`` matrices of
+stops plus their cumulative distances, appended in place when a ride
+joins.
+
+Opening a new group needs a cab (a database query), so the kernel stops
+at the first ride it cannot place and returns its index; the caller
+opens the group with :meth:`CellBatch.open_group` and resumes.  Results
+are read back from ``assignment`` / ``position`` and persisted by the
+caller.
+
+When Numba is not installed the kernels run as plain Python.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from .distance import haversine_km_array
+from .distance_nb import NUMBA_AVAILABLE, haversine_km
+
+
+def _append_stop(g, plat, plng, dlat, dlng, direct, seats, lug, b):
+    """Append one passenger to group *g* of batch columns *b*."""
+    (g_seats, g_lug, g_n, g_plat, g_plng, g_dlat, g_dlng,
+     g_direct, g_pcum, g_dcum) = b
+    k = g_n[g]
+    if k > 0:
+        g_pcum[g, k] = g_pcum[g, k - 1] + haversine_km(
+            g_plat[g, k - 1], g_plng[g, k - 1], plat, plng
+        )
+        g_dcum[g, k] = g_dcum[g, k - 1] + haversine_km(
+            g_dlat[g, k - 1], g_dlng[g, k - 1], dlat, dlng
+        )
+    else:
+        g_pcum[g, 0] = 0.0
+        g_dcum[g, 0] = 0.0
+    g_plat[g, k] = plat
+    g_plng[g, k] = plng
+    g_dlat[g, k] = dlat
+    g_dlng[g, k] = dlng
+    g_direct[g, k] = direct
+    g_seats[g] += seats
+    g_lug[g] += lug
+    g_n[g] = k + 1
+
+
+def _accepts(g, plat, plng, dlat, dlng, direct, limit, b):
+    """
+    Whether group *g* of batch columns *b* can take the new passenger
+    without any passenger's shared leg exceeding ``limit x direct``.
+
+    Only the three hops around the new stops are computed; the rest of
+    the route comes from the cached cumulative distances.  O(k).
+    """
+    (g_seats, g_lug, g_n, g_plat, g_plng, g_dlat, g_dlng,
+     g_direct, g_pcum, g_dcum) = b
+    k = g_n[g]
+    if k == 0:
+        return True
+
+    to_pickup = haversine_km(g_plat[g, k - 1], g_plng[g, k - 1], plat, plng)
+    to_first_drop = haversine_km(plat, plng, g_dlat[g, 0], g_dlng[g, 0])
+    tail = haversine_km(g_dlat[g, k - 1], g_dlng[g, k - 1], dlat, dlng)
+
+    first_drop = g_pcum[g, k - 1] + to_pickup + to_first_drop
+    for j in range(k):
+        if g_direct[g, j] >= 0.1:
+            shared = first_drop + g_dcum[g, j] - g_pcum[g, j]
+            if shared > limit * g_direct[g, j]:
+                return False
+
+    new_shared = to_first_drop + g_dcum[g, k - 1] + tail
+    return direct < 0.1 or new_shared <= limit * direct
+
+
+def _greedy_match(
+    start, n_groups, r_plat, r_plng, r_dlat, r_dlng, r_direct, r_seats, r_lug,
+    g_seat_cap, g_lug_cap, b, tolerance, assignment, position,
+):
+    """
+    Place rides ``start..`` into the first feasible of ``n_groups`` groups.
+    Returns the index of the first ride that fits nowhere, or the ride
+    count when every ride was placed.
+    """
+    g_seats, g_lug, g_n = b[0], b[1], b[2]
+    width = b[3].shape[1]
+    limit = 1.0 + tolerance
+    for i in range(start, r_plat.shape[0]):
+        placed = False
+        for g in range(n_groups):
+            if (
+                g_n[g] >= width
+                or g_seats[g] + r_seats[i] > g_seat_cap[g]
+                or g_lug[g] + r_lug[i] > g_lug_cap[g]
+            ):
+                continue
+            if not _accepts(
+                g, r_plat[i], r_plng[i], r_dlat[i], r_dlng[i], r_direct[i], limit, b
+            ):
+                continue
+            _append_stop(
+                g, r_plat[i], r_plng[i], r_dlat[i], r_dlng[i], r_direct[i],
+                r_seats[i], r_lug[i], b,
+            )
+            assignment[i] = g
+            position[i] = g_n[g]
+            placed = True
+            break
+        if not placed:
+            return i
+    return r_plat.shape[0]
+
+
+if NUMBA_AVAILABLE:
+    from numba import njit
+
+    _append_stop = njit(cache=True)(_append_stop)
+    _accepts = njit(cache=True)(_accepts)
+    _greedy_match = njit(cache=True)(_greedy_match)
+
+
+class CellBatch:
+    """
+    SoA columns for one cell: rides ``r_*`` and groups ``g_*``.
+
+    Group rows are pre-allocated for every existing group plus one new
+    group per ride (the worst case).  Route matrices are as wide as the
+    largest seat capacity seen, since every passenger takes a seat; they
+    are only widened if a new group's cab is larger.
+    """
+
+    def __init__(self, rides, groups):
+        """
+        *rides*: ``(plat, plng, dlat, dlng, seats, luggage)`` tuples.
+        *groups*: ``(seat_cap, luggage_cap, seats, luggage, stops)`` tuples,
+        ``stops`` being ``(plat, plng, dlat, dlng)`` per existing passenger.
+        """
+        n = len(rides)
+        rows = len(groups) + n
+        width = max([1] + [max(g[0], len(g[4])) for g in groups])
+
+        cols = np.array(rides, dtype=np.float64).reshape(n, 6)
+        self.r_plat = np.ascontiguousarray(cols[:, 0])
+        self.r_plng = np.ascontiguousarray(cols[:, 1])
+        self.r_dlat = np.ascontiguousarray(cols[:, 2])
+        self.r_dlng = np.ascontiguousarray(cols[:, 3])
+        self.r_seats = cols[:, 4].astype(np.int64)
+        self.r_lug = cols[:, 5].astype(np.int64)
+        self.r_direct = haversine_km_array(
+            self.r_plat, self.r_plng, self.r_dlat, self.r_dlng, dtype=np.float64
+        )
+
+        self.g_seat_cap = np.zeros(rows, dtype=np.int64)
+        self.g_lug_cap = np.zeros(rows, dtype=np.int64)
+        self.columns = (
+            np.zeros(rows, dtype=np.int64),             # seats occupied
+            np.zeros(rows, dtype=np.int64),             # luggage occupied
+            np.zeros(rows, dtype=np.int64),             # passengers
+            np.zeros((rows, width), dtype=np.float64),  # pickup lat
+            np.zeros((rows, width), dtype=np.float64),  # pickup lng
+            np.zeros((rows, width), dtype=np.float64),  # drop-off lat
+            np.zeros((rows, width), dtype=np.float64),  # drop-off lng
+            np.zeros((rows, width), dtype=np.float64),  # direct km
+            np.zeros((rows, width), dtype=np.float64),  # pickup-chain cum
+            np.zeros((rows, width), dtype=np.float64),  # drop-off-chain cum
+        )
+        self.n_groups = 0
+        self.assignment = np.full(n, -1, dtype=np.int64)
+        self.position = np.zeros(n, dtype=np.int64)
+
+        for seat_cap, lug_cap, seats, lug, stops in groups:
+            g = self._new_row(seat_cap, lug_cap)
+            for plat, plng, dlat, dlng in stops:
+                _append_stop(
+                    g, plat, plng, dlat, dlng,
+                    haversine_km(plat, plng, dlat, dlng), 0, 0, self.columns,
+                )
+            self.seats[g] = seats
+            self.luggage[g] = lug
+
+    @property
+    def seats(self) -> np.ndarray:
+        return self.columns[0]
+
+    @property
+    def luggage(self) -> np.ndarray:
+        return self.columns[1]
+
+    def _ensure_width(self, width: int) -> None:
+        extra = width - self.columns[3].shape[1]
+        if extra > 0:
+            self.columns = self.columns[:3] + tuple(
+                np.pad(c, ((0, 0), (0, extra))) for c in self.columns[3:]
+            )
+
+    def _new_row(self, seat_cap: int, lug_cap: int) -> int:
+        g = self.n_groups
+        self.g_seat_cap[g] = seat_cap
+        self.g_lug_cap[g] = lug_cap
+        self.n_groups += 1
+        return g
+
+    def match(self, start: int, tolerance: float) -> int:
+        """Run the kernel from ride *start*; returns the first unplaced ride."""
+        return _greedy_match(
+            start, self.n_groups,
+            self.r_plat, self.r_plng, self.r_dlat, self.r_dlng, self.r_direct,
+            self.r_seats, self.r_lug, self.g_seat_cap, self.g_lug_cap,
+            self.columns, tolerance, self.assignment, self.position,
+        )
+
+    def open_group(self, ride: int, seat_cap: int, lug_cap: int) -> int:
+        """Open a new group with *ride* as its first passenger."""
+        self._ensure_width(seat_cap)
+        g = self._new_row(seat_cap, lug_cap)
+        _append_stop(
+            g, self.r_plat[ride], self.r_plng[ride], self.r_dlat[ride],
+            self.r_dlng[ride], self.r_direct[ride], self.r_seats[ride],
+            self.r_lug[ride], self.columns,
+        )
+        self.assignment[ride] = g
+        self.position[ride] = 1
+        return g
+
+
+def warm_up() -> None:
+    """Trigger JIT compilation (or cache load) of the kernel."""
+    batch = CellBatch([(0.0, 0.0, 0.0, 0.0, 1, 0)], [(4, 3, 0, 0, [])])
+    batch.match(0, 0.4)
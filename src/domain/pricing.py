@@ -9,6 +9,9 @@ Price = (Base_Fare + Distance x Rate_Per_KM) x Surge_Multiplier x (1 - Pooling_D
 * **Surge_Multiplier** = clamp(active_requests / available_cabs, 1.0, 3.0)
 * **Pooling_Discount**: 0 % for 1st passenger, 20 % for 2nd, 30 % for 3rd+
 
+``PricingEngine.calculate_price_fast`` is the allocation-free form used by
+the matching worker, with the surge computed once per cycle.
+
 Complexity: O(1) per price calculation.
 """
 
@@ -16,7 +19,11 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 
-from .distance import haversine_km
+from .distance_nb import haversine_km
+
+
+# Pooling discount indexed by passenger position, clamped to 1..3 (3 = 3rd+)
+POOL_DISCOUNTS = (0.0, 0.0, 0.20, 0.30)
 
 
 # ── Strategy hierarchy ────────────────────────────────────────────────
@@ -49,10 +56,10 @@ class SurgePricing(PricingStrategy):
 class PoolDiscountPricing(PricingStrategy):
     """Applies surge *and* a position-based pooling discount."""
 
-    DISCOUNTS = {1: 0.0, 2: 0.20, 3: 0.30}
+    DISCOUNTS = POOL_DISCOUNTS
 
     def __init__(self, passenger_position: int, surge_multiplier: float = 1.0):
-        self.discount = self.DISCOUNTS.get(min(passenger_position, 3), 0.30)
+        self.discount = self.DISCOUNTS[max(1, min(passenger_position, 3))]
         self.surge_multiplier = surge_multiplier
 
     def calculate(
@@ -76,7 +83,8 @@ class PricingEngine:
     def compute_surge(active_requests: int, available_cabs: int) -> float:
         if available_cabs <= 0:
             return 3.0
-        return min(3.0, max(1.0, active_requests / available_cabs))
+        ratio = active_requests / available_cabs
+        return 1.0 if ratio < 1.0 else (3.0 if ratio > 3.0 else ratio)
 
     def calculate_price(
         self,
@@ -92,3 +100,14 @@ class PricingEngine:
         surge = self.compute_surge(active_requests, available_cabs)
         strategy = PoolDiscountPricing(passenger_position, surge)
         return strategy.calculate(distance, self.base_fare, self.rate_per_km)
+
+    def calculate_price_fast(
+        self, distance_km: float, passenger_position: int, surge: float
+    ) -> float:
+        """
+        Same result as :meth:`calculate_price` for callers that already
+        hold the distance and a surge computed once per batch (the
+        matching worker): no strategy allocation, no trig.
+        """
+        raw = (self.base_fare + distance_km * self.rate_per_km) * surge
+        return round(raw * (1 - POOL_DISCOUNTS[max(1, min(passenger_position, 3))]), 2)
@@ -0,0 +1,55 @@
+"""
+Redis read-through cache for ride status polling.
+
+Clients poll ``GET /rides/{id}`` while waiting for a match, so the
+serialised ``RideResponse`` is cached under ``ride:{id}`` for a few
+seconds.  Writers (cancel endpoint, matching worker) invalidate the key.
+
+The cache is best-effort: Redis errors are logged and treated as a miss
+so the API keeps serving from PostgreSQL when Redis is unavailable.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Optional
+
+import orjson
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+RIDE_TTL_SECONDS = 5
+
+
+def ride_key(ride_id: int) -> str:
+    return f"ride:{ride_id}"
+
+
+class RideCache:
+    def __init__(self, client: aioredis.Redis, ttl_seconds: int = RIDE_TTL_SECONDS):
+        self.redis = client
+        self.ttl = ttl_seconds
+
+    async def get(self, ride_id: int) -> Optional[bytes]:
+        """Return the cached JSON document for *ride_id*, or ``None``."""
+        try:
+            return await self.redis.get(ride_key(ride_id))
+        except RedisError:
+            logger.warning("Ride cache read failed", exc_info=True)
+            return None
+
+    async def set(self, ride_id: int, payload: dict) -> None:
+        try:
+            await self.redis.set(ride_key(ride_id), orjson.dumps(payload), ex=self.ttl)
+        except RedisError:
+            logger.warning("Ride cache write failed", exc_info=True)
+
+    async def invalidate(self, *ride_ids: int) -> None:
+        if not ride_ids:
+            return
+        try:
+            await self.redis.delete(*(ride_key(i) for i in ride_ids))
+        except RedisError:
+            logger.warning("Ride cache invalidation failed", exc_info=True)
@@ -2,24 +2,44 @@
 Async SQLAlchemy engine and session factory.
 
 Uses ``asyncpg`` as the PostgreSQL driver for non-blocking I/O.
-Pool is sized for the stated 100 RPS requirement.
+
+By default the app connects through PgBouncer in *transaction* pooling
+mode, so SQLAlchemy keeps no pool of its own (``NullPool``) and asyncpg's
+prepared-statement cache is disabled -- server-side prepared statements
+do not survive PgBouncer handing the backend to another client.  Set
+``USE_PGBOUNCER=false`` to connect straight to PostgreSQL with a local
+pool sized for the stated 100 RPS requirement.
 """
 
+from uuid import uuid4
+
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import NullPool
 
 from src.config import settings
 
-engine = create_async_engine(
-    settings.database_url,
-    echo=False,
-    pool_size=20,
-    max_overflow=10,
-)
+if settings.use_pgbouncer:
+    engine = create_async_engine(
+        settings.database_url,
+        echo=False,
+        poolclass=NullPool,
+        connect_args={
+            "statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        },
+    )
+else:
+    engine = create_async_engine(
+        settings.database_url,
+        echo=False,
+        pool_size=20,
+        max_overflow=10,
+    )
 
 async_session_factory = async_sessionmaker(
     engine,
@@ -1,19 +1,32 @@
 """
 Redis-based distributed lock.
 
-Used by the matching worker to ensure only one instance runs the
-matching cycle at a time.  In production this could be extended to
-per-H3-cell locks for parallelism.
+Used by the matching worker as a per-H3-cell lock
+(``lock:matching:<cell>``) so only one instance matches a given cell at
+a time while different cells are matched in parallel.
 
 Implementation uses SET NX EX for acquire and a Lua script for
-atomic check-and-delete on release.
+atomic check-and-delete on release.  The script is invoked by SHA
+(``EVALSHA``) so its source is not resent on every release; ``EVAL``
+runs only when the server does not have it cached yet (``NOSCRIPT``).
 """
 
 from __future__ import annotations
 
+import hashlib
 import uuid
 
 import redis.asyncio as aioredis
+from redis.exceptions import NoScriptError
+
+_RELEASE_LUA = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+else
+    return 0
+end
+"""
+_RELEASE_SHA = hashlib.sha1(_RELEASE_LUA.encode()).hexdigest()
 
 
 class DistributedLock:
@@ -23,7 +36,7 @@ class DistributedLock:
         self.redis = client
         self.key = f"lock:{key}"
         self.ttl = ttl_seconds
-        self.token = str(uuid.uuid4())
+        self.token = uuid.uuid4().bytes  # 16 raw bytes; Lua compares as-is
 
     async def acquire(self) -> bool:
         """Try to acquire. Returns True on success."""
@@ -33,14 +46,12 @@ class DistributedLock:
 
     async def release(self) -> None:
         """Release only if we still own the lock (atomic via Lua)."""
-        lua = """
-        if redis.call("get", KEYS[1]) == ARGV[1] then
-            return redis.call("del", KEYS[1])
-        else
-            return 0
-        end
-        """
-        await self.redis.eval(lua, 1, self.key, self.token)
+        try:
+            await self.redis.evalsha(_RELEASE_SHA, 1, self.key, self.token)
+        except NoScriptError:
+            # First release on this server (or after SCRIPT FLUSH); EVAL
+            # also caches the script for subsequent EVALSHA calls.
+            await self.redis.eval(_RELEASE_LUA, 1, self.key, self.token)
 
     # context-manager support
     async def __aenter__(self):
@@ -12,8 +12,14 @@ Indexes
 -------
 * **GIST** on geometry columns (pickup_point, dropoff_point, current_location)
   for efficient spatial queries.
-* **B-Tree** on ``status``, ``user_id``, ``ride_group_id``, ``idempotency_key``
-  for fast look-ups used by the matching engine and API.
+* **B-Tree** on ``(status, created_at)``, ``user_id``,
+  ``(ride_group_id, status)``, ``idempotency_key`` for fast look-ups used
+  by the matching engine and API.
+* **Partial** indexes for the matcher: GIST on available cabs' location
+  and on MATCHED rides' pickup (both as geography), and a B-Tree on
+  ``(pickup_h3, created_at)`` of PENDING rides.  The PENDING sweep reads
+  through ``idx_rides_pending_cell`` per cell, with
+  ``idx_rides_status_created`` for any status + age filter.
 """
 
 from sqlalchemy import (
@@ -27,7 +33,9 @@ from sqlalchemy import (
     Integer,
     String,
     func,
+    text,
 )
+from sqlalchemy.orm import relationship
 from geoalchemy2 import Geometry
 
 from .database import Base
@@ -57,7 +65,13 @@ class CabModel(Base):
 
     __table_args__ = (
         Index("idx_cabs_location", "current_location", postgresql_using="gist"),
-        Index("idx_cabs_available", "is_available"),
+        # Nearest-available-cab lookup (geography ST_DWithin + KNN)
+        Index(
+            "idx_cabs_loc_available",
+            text("geography(current_location)"),
+            postgresql_using="gist",
+            postgresql_where=text("is_available"),
+        ),
     )
 
 
@@ -83,6 +97,8 @@ class RideModel(Base):
     ride_group_id = Column(Integer, ForeignKey("ride_groups.id"), nullable=True)
     idempotency_key = Column(String(64), unique=True, nullable=True)
     price = Column(Float, nullable=True)
+    # H3 cell of the pickup at ``settings.h3_resolution``, fixed on insert
+    pickup_h3 = Column(String(20), nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(
@@ -92,9 +108,23 @@ class RideModel(Base):
     __table_args__ = (
         Index("idx_rides_pickup", "pickup_point", postgresql_using="gist"),
         Index("idx_rides_dropoff", "dropoff_point", postgresql_using="gist"),
-        Index("idx_rides_status", "status"),
+        Index(
+            "idx_rides_pickup_matched",
+            text("geography(pickup_point)"),
+            postgresql_using="gist",
+            postgresql_where=text("status = 'MATCHED'"),
+        ),
+        # status-leading: serves status filters and status + created_at order
+        Index("idx_rides_status_created", "status", "created_at"),
+        Index(
+            "idx_rides_pending_cell",
+            "pickup_h3",
+            "created_at",
+            postgresql_where=text("status = 'PENDING'"),
+        ),
         Index("idx_rides_user", "user_id"),
-        Index("idx_rides_group", "ride_group_id"),
+        # group-leading: rides of a group, optionally filtered by status
+        Index("idx_rides_group_status", "ride_group_id", "status"),
         Index("idx_rides_idempotency", "idempotency_key"),
     )
 
@@ -114,6 +144,11 @@ class RideGroupModel(Base):
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
 
+    # Must be loaded explicitly (e.g. ``selectinload``) -- lazy access raises
+    # so accidental N+1 queries surface immediately.
+    rides = relationship("RideModel", lazy="raise")
+    cab = relationship("CabModel", lazy="raise")
+
     __table_args__ = (
         Index("idx_ride_groups_status", "status"),
         Index("idx_ride_groups_cell", "h3_cell"),
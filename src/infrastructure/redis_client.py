@@ -1,12 +1,16 @@
-"""Redis async connection pool."""
+"""
+Redis async connection pool.
+
+Replies are left as ``bytes`` (no ``decode_responses``): cached ride JSON
+is sent to clients as-is and lock tokens are compared byte-for-byte, so
+decoding every reply to ``str`` would only add an allocation per call.
+"""
 
 import redis.asyncio as aioredis
 
 from src.config import settings
 
-_pool = aioredis.ConnectionPool.from_url(
-    settings.redis_url, decode_responses=True
-)
+_pool = aioredis.ConnectionPool.from_url(settings.redis_url)
 
 
 async def get_redis() -> aioredis.Redis:
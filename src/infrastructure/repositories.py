@@ -7,13 +7,136 @@ domain-relevant queries only.
 
 from __future__ import annotations
 
-from typing import Optional
+from itertools import groupby
+from operator import attrgetter
+from typing import Optional, Sequence
 
-from sqlalchemy import func, select, update
+from sqlalchemy import Select, func, insert, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 
 from .models import CabModel, RideGroupModel, RideModel, UserModel
-from src.domain.enums import RideStatus
+from src.config import settings
+from src.domain.entities import InvalidStateTransition
+from src.domain.enums import CANCELLABLE_STATUSES, RideStatus
+from src.domain.matching import bin_rides_by_cell, ride_h3_cell
+
+
+# Columns served by the ride read endpoints (mirrors ``RideResponse``)
+RIDE_RESPONSE_COLUMNS = (
+    RideModel.id,
+    RideModel.user_id,
+    RideModel.pickup_lat,
+    RideModel.pickup_lng,
+    RideModel.dropoff_lat,
+    RideModel.dropoff_lng,
+    RideModel.status,
+    RideModel.seats_requested,
+    RideModel.luggage_count,
+    RideModel.ride_group_id,
+    RideModel.price,
+    RideModel.created_at,
+)
+
+
+# Cancels a ride.  ``target`` locks the ride row; under READ COMMITTED a
+# row that was locked by the matcher is re-read at its committed version
+# once the lock is granted, so the group / seats / luggage are taken from
+# ``target`` itself -- a plain re-join of ``rides`` would read the stale
+# statement snapshot (e.g. still PENDING with no group).
+_CANCEL_RIDE_SQL = text(
+    f"""
+    WITH target AS (
+        SELECT id, status, ride_group_id, seats_requested, luggage_count
+        FROM rides WHERE id = :ride_id FOR UPDATE
+    ),
+    cancelled AS (
+        UPDATE rides r
+        SET status = 'CANCELLED', ride_group_id = NULL, updated_at = now()
+        FROM target t
+        WHERE r.id = t.id
+          AND t.status IN ({", ".join(f"'{s}'" for s in sorted(CANCELLABLE_STATUSES))})
+        RETURNING r.id, r.user_id, r.pickup_lat, r.pickup_lng,
+                  r.dropoff_lat, r.dropoff_lng, r.status, r.seats_requested,
+                  r.luggage_count, r.ride_group_id, r.price, r.created_at
+    )
+    SELECT t.status AS previous_status, t.ride_group_id AS released_group_id,
+           c.*
+    FROM target t LEFT JOIN cancelled c ON c.id = t.id
+    """
+)
+
+# Serialises the release with the matcher, which holds candidate groups
+# FOR UPDATE while it adds rides to them.
+_LOCK_GROUP_SQL = text("SELECT id FROM ride_groups WHERE id = :group_id FOR UPDATE")
+
+# Frees the cancelled ride's capacity and, when no live ride (neither
+# CANCELLED nor COMPLETED) is left, deactivates the group and releases
+# its cab.  Runs as its own statement after the group lock, so the
+# live-ride probe sees rides the matcher committed while this
+# transaction waited.
+_RELEASE_GROUP_SQL = text(
+    """
+    WITH released AS (
+        UPDATE ride_groups g
+        SET seats_occupied = GREATEST(0, g.seats_occupied - :seats),
+            luggage_occupied = GREATEST(0, g.luggage_occupied - :luggage),
+            status = CASE
+                WHEN EXISTS (
+                    SELECT 1 FROM rides o
+                    WHERE o.ride_group_id = g.id
+                      AND o.status NOT IN ('CANCELLED', 'COMPLETED')
+                ) THEN g.status
+                ELSE 'INACTIVE'
+            END,
+            updated_at = now()
+        WHERE g.id = :group_id
+        RETURNING g.cab_id, g.status
+    )
+    UPDATE cabs c SET is_available = true
+    FROM released rel
+    WHERE c.id = rel.cab_id AND rel.status = 'INACTIVE'
+    """
+)
+
+
+# A group holds at most one ride per seat of its cab (VAN: 8), so the
+# nearest k x 8 MATCHED rides always span at least k groups.
+_MAX_RIDES_PER_GROUP = 8
+
+# Matching only reads a group's cab capacity; loading just these columns
+# keeps the joined row narrow (no EWKB location per group).
+_CAB_CAPACITY = joinedload(RideGroupModel.cab).load_only(
+    CabModel.max_seats, CabModel.max_luggage
+)
+
+
+def _nearest_available_cabs_query(
+    lat: float,
+    lng: float,
+    k: int,
+    radius_m: Optional[float],
+    exclude: Sequence[int],
+) -> Select:
+    """The ``CabRepository.nearest_available_cabs`` statement."""
+    # geography(...) must match the index expression verbatim, and the
+    # filter must be the bare boolean: before PostgreSQL 17 the planner
+    # cannot prove ``is_available IS true`` implies the index predicate
+    location = func.geography(CabModel.current_location)
+    point = func.geography(func.ST_SetSRID(func.ST_MakePoint(lng, lat), 4326))
+    query = (
+        select(CabModel)
+        .where(CabModel.is_available)
+        .order_by(location.op("<->")(point))
+        .limit(k)
+        .with_for_update(skip_locked=True)
+    )
+    if radius_m is not None:
+        query = query.where(func.ST_DWithin(location, point, radius_m))
+    if exclude:
+        query = query.where(CabModel.id.not_in(exclude))
+    return query
 
 
 class RideRepository:
@@ -38,43 +161,161 @@ class RideRepository:
         idempotency_key: str | None = None,
         status: RideStatus = RideStatus.PENDING,
     ) -> RideModel:
-        """Create a ride with proper PostGIS geometry columns."""
-        from geoalchemy2.functions import ST_MakePoint
-
-        ride = RideModel(
-            user_id=user_id,
-            pickup_lat=pickup_lat,
-            pickup_lng=pickup_lng,
-            dropoff_lat=dropoff_lat,
-            dropoff_lng=dropoff_lng,
-            pickup_point=ST_MakePoint(pickup_lng, pickup_lat),
-            dropoff_point=ST_MakePoint(dropoff_lng, dropoff_lat),
-            seats_requested=seats_requested,
-            luggage_count=luggage_count,
-            idempotency_key=idempotency_key,
-            status=status,
+        """
+        Create a ride with proper PostGIS geometry columns.
+
+        Idempotent in one round-trip: ``INSERT ... ON CONFLICT
+        (idempotency_key) DO NOTHING RETURNING`` relies on the unique
+        constraint, and only a duplicate key costs a follow-up SELECT.
+
+        The pickup's H3 cell is computed once here so the matcher never
+        re-bins stored rides.
+        """
+        stmt = (
+            pg_insert(RideModel)
+            .values(
+                user_id=user_id,
+                pickup_lat=pickup_lat,
+                pickup_lng=pickup_lng,
+                dropoff_lat=dropoff_lat,
+                dropoff_lng=dropoff_lng,
+                pickup_point=func.ST_SetSRID(
+                    func.ST_MakePoint(pickup_lng, pickup_lat), 4326
+                ),
+                dropoff_point=func.ST_SetSRID(
+                    func.ST_MakePoint(dropoff_lng, dropoff_lat), 4326
+                ),
+                seats_requested=seats_requested,
+                luggage_count=luggage_count,
+                idempotency_key=idempotency_key,
+                status=status,
+                pickup_h3=ride_h3_cell(
+                    pickup_lat, pickup_lng, settings.h3_resolution
+                ),
+            )
+            .on_conflict_do_nothing(index_elements=[RideModel.idempotency_key])
+            .returning(RideModel)
         )
-        self.session.add(ride)
-        await self.session.flush()
+        ride = (await self.session.scalars(stmt)).one_or_none()
+        if ride is None:
+            ride = await self.get_by_idempotency_key(idempotency_key)
         return ride
 
     async def get_by_id(self, ride_id: int) -> Optional[RideModel]:
         return await self.session.get(RideModel, ride_id)
 
+    async def get_response_by_id(self, ride_id: int) -> Optional[dict]:
+        """
+        Read-only projection of the ``RideResponse`` columns.
+
+        Skips the geometry columns (no EWKB transfer / decode) and the
+        identity map -- use ``get_by_id`` when the ride will be mutated.
+        """
+        result = await self.session.execute(
+            select(*RIDE_RESPONSE_COLUMNS).where(RideModel.id == ride_id)
+        )
+        row = result.first()
+        return dict(row._mapping) if row else None
+
     async def get_by_idempotency_key(self, key: str) -> Optional[RideModel]:
         result = await self.session.execute(
             select(RideModel).where(RideModel.idempotency_key == key)
         )
         return result.scalar_one_or_none()
 
-    async def get_pending_rides(self) -> list[RideModel]:
+    async def get_pending_ids_by_cell(self) -> dict[str, list[int]]:
+        """
+        PENDING ride ids grouped by pickup H3 cell, oldest first within each
+        cell, read in ``(pickup_h3, created_at)`` order from
+        ``idx_rides_pending_cell`` so grouping is a single linear pass.
+        Only the columns needed for binning are selected -- the matcher
+        re-reads the full rows under lock -- so no ORM objects are built.
+        Rides stored before ``pickup_h3`` existed (NULL, sorted last) are
+        binned in Python.
+        """
         result = await self.session.execute(
-            select(RideModel)
+            select(
+                RideModel.id,
+                RideModel.pickup_h3,
+                RideModel.pickup_lat,
+                RideModel.pickup_lng,
+            )
             .where(RideModel.status == RideStatus.PENDING)
+            .order_by(RideModel.pickup_h3, RideModel.created_at)
+        )
+        cells: dict[str, list[int]] = {}
+        for cell, rows in groupby(result, key=attrgetter("pickup_h3")):
+            if cell is not None:
+                cells[cell] = [row.id for row in rows]
+                continue
+            for legacy_cell, legacy in bin_rides_by_cell(
+                list(rows), settings.h3_resolution
+            ).items():
+                cells.setdefault(legacy_cell, []).extend(r.id for r in legacy)
+        return cells
+
+    async def get_pending_by_ids_for_update(
+        self, ride_ids: Sequence[int]
+    ) -> list[RideModel]:
+        """
+        The still-PENDING rides among *ride_ids*, oldest first, row-locked.
+        ``SKIP LOCKED`` drops rides another transaction is cancelling or
+        matching instead of waiting on them.
+        """
+        result = await self.session.execute(
+            select(RideModel)
+            .where(
+                RideModel.id.in_(ride_ids),
+                RideModel.status == RideStatus.PENDING,
+            )
             .order_by(RideModel.created_at)
+            .with_for_update(skip_locked=True)
         )
         return list(result.scalars().all())
 
+    async def bulk_update(self, rows: Sequence[dict]) -> None:
+        """
+        ORM bulk UPDATE by primary key: each dict carries ``id`` plus the
+        columns to set, and SQLAlchemy sends them as one executemany.
+        """
+        if rows:
+            await self.session.execute(update(RideModel), list(rows))
+
+    async def cancel(self, ride_id: int) -> Optional[dict]:
+        """
+        Cancel a ride, freeing its group's capacity and, when no live rides
+        remain, deactivating the group and releasing its cab.
+
+        One round-trip for an unmatched ride; a matched one adds the group
+        lock and the release (see ``_RELEASE_GROUP_SQL``).
+
+        Returns the cancelled ride's ``RideResponse`` columns, ``None`` if
+        the ride does not exist, and raises ``InvalidStateTransition`` if
+        its status cannot move to CANCELLED.
+        """
+        result = await self.session.execute(_CANCEL_RIDE_SQL, {"ride_id": ride_id})
+        row = result.first()
+        if row is None:
+            return None
+        ride = dict(row._mapping)
+        previous_status = ride.pop("previous_status")
+        group_id = ride.pop("released_group_id")
+        if ride["id"] is None:
+            raise InvalidStateTransition(
+                f"Cannot cancel ride in status {previous_status}"
+            )
+        if group_id is not None:
+            await self.session.execute(_LOCK_GROUP_SQL, {"group_id": group_id})
+            await self.session.execute(
+                _RELEASE_GROUP_SQL,
+                {
+                    "group_id": group_id,
+                    "seats": ride["seats_requested"],
+                    "luggage": ride["luggage_count"],
+                },
+            )
+        return ride
+
     async def get_rides_in_group(self, group_id: int) -> list[RideModel]:
         result = await self.session.execute(
             select(RideModel).where(RideModel.ride_group_id == group_id)
@@ -99,22 +340,77 @@ class RideGroupRepository:
         await self.session.flush()
         return group
 
+    async def create_many(self, rows: Sequence[dict]) -> list[int]:
+        """Insert groups from column dicts in one statement; ids in input order."""
+        if not rows:
+            return []
+        result = await self.session.execute(
+            insert(RideGroupModel).returning(
+                RideGroupModel.id, sort_by_parameter_order=True
+            ),
+            list(rows),
+        )
+        return list(result.scalars().all())
+
+    async def bulk_update(self, rows: Sequence[dict]) -> None:
+        """ORM bulk UPDATE by primary key (one executemany)."""
+        if rows:
+            await self.session.execute(update(RideGroupModel), list(rows))
+
     async def get_by_id(self, group_id: int) -> Optional[RideGroupModel]:
         return await self.session.get(RideGroupModel, group_id)
 
-    async def get_active_groups_for_update(
-        self, h3_cell: str | None = None
+    async def get_candidates_near(
+        self, lat: float, lng: float, radius_m: float = 3_000.0, k: int = 20
     ) -> list[RideGroupModel]:
-        """SELECT ... FOR UPDATE to prevent concurrent modifications."""
-        query = (
-            select(RideGroupModel)
+        """
+        Up to *k* ACTIVE groups with a MATCHED ride picked up within
+        *radius_m* of the point, nearest first, with ``rides`` and ``cab``
+        capacity eagerly loaded and the group rows locked.
+
+        The KNN step runs over rides, not groups: ``ORDER BY pickup <->
+        point LIMIT n`` on the partial ``idx_rides_pickup_matched``
+        geography index walks only the nearest *n* rides.  *n* is
+        ``k x _MAX_RIDES_PER_GROUP``, enough to contain *k* distinct
+        groups, which are then picked from those few rows.  Rows are
+        locked in id order in a second statement -- locking in distance
+        order could deadlock two cells that share candidates.
+        """
+        pickup = func.geography(RideModel.pickup_point)
+        point = func.geography(func.ST_SetSRID(func.ST_MakePoint(lng, lat), 4326))
+        distance = pickup.op("<->")(point)
+        near = (
+            select(RideModel.ride_group_id, distance.label("distance"))
+            .where(
+                RideModel.status == RideStatus.MATCHED,
+                func.ST_DWithin(pickup, point, radius_m),
+            )
+            .order_by(distance)
+            .limit(k * _MAX_RIDES_PER_GROUP)
+            .subquery()
+        )
+        nearest = await self.session.execute(
+            select(near.c.ride_group_id)
+            .join(RideGroupModel, RideGroupModel.id == near.c.ride_group_id)
             .where(RideGroupModel.status == "ACTIVE")
-            .with_for_update()
+            .group_by(near.c.ride_group_id)
+            .order_by(func.min(near.c.distance))
+            .limit(k)
         )
-        if h3_cell:
-            query = query.where(RideGroupModel.h3_cell == h3_cell)
-        result = await self.session.execute(query)
-        return list(result.scalars().all())
+        rank = {group_id: i for i, group_id in enumerate(nearest.scalars())}
+        if not rank:
+            return []
+
+        result = await self.session.execute(
+            select(RideGroupModel)
+            .options(selectinload(RideGroupModel.rides), _CAB_CAPACITY)
+            .where(
+                RideGroupModel.id.in_(rank), RideGroupModel.status == "ACTIVE"
+            )
+            .order_by(RideGroupModel.id)
+            .with_for_update(of=RideGroupModel)
+        )
+        return sorted(result.unique().scalars().all(), key=lambda g: rank[g.id])
 
     async def get_active_groups(self) -> list[RideGroupModel]:
         result = await self.session.execute(
@@ -122,25 +418,61 @@ class RideGroupRepository:
         )
         return list(result.scalars().all())
 
+    async def get_active_groups_with_rides(self) -> list[RideGroupModel]:
+        """Active groups with ``rides`` eagerly loaded (2 queries total)."""
+        result = await self.session.execute(
+            select(RideGroupModel)
+            .options(selectinload(RideGroupModel.rides))
+            .where(RideGroupModel.status == "ACTIVE")
+        )
+        return list(result.scalars().all())
+
 
 class CabRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_available(self) -> list[CabModel]:
+    async def get_by_id(self, cab_id: int) -> Optional[CabModel]:
+        return await self.session.get(CabModel, cab_id)
+
+    async def nearest_available_cabs(
+        self,
+        lat: float,
+        lng: float,
+        k: int = 1,
+        radius_m: Optional[float] = 5_000.0,
+        exclude: Sequence[int] = (),
+    ) -> list[CabModel]:
+        """
+        Up to *k* available cabs within *radius_m* of the point (anywhere
+        when ``None``), nearest first, skipping the ids in *exclude*.
+        ``ST_DWithin`` and the ``<->`` KNN ordering both work on geography
+        so the partial ``idx_cabs_loc_available`` GIST index serves the
+        whole query.
+
+        Returned cabs are row-locked with ``SKIP LOCKED`` so concurrent
+        matching transactions never hand out the same cab.
+        """
         result = await self.session.execute(
-            select(CabModel).where(CabModel.is_available.is_(True))
+            _nearest_available_cabs_query(lat, lng, k, radius_m, exclude)
         )
         return list(result.scalars().all())
 
-    async def get_by_id(self, cab_id: int) -> Optional[CabModel]:
-        return await self.session.get(CabModel, cab_id)
+    async def mark_unavailable(self, cab_ids: Sequence[int]) -> None:
+        """Flag *cab_ids* as taken in one Core UPDATE (no ORM flush)."""
+        if cab_ids:
+            await self.session.execute(
+                update(CabModel)
+                .where(CabModel.id.in_(cab_ids))
+                .values(is_available=False)
+                .execution_options(synchronize_session=False)
+            )
 
     async def count_available(self) -> int:
         result = await self.session.execute(
             select(func.count())
             .select_from(CabModel)
-            .where(CabModel.is_available.is_(True))
+            .where(CabModel.is_available)
         )
         return result.scalar() or 0
 
@@ -6,34 +6,46 @@ Runs every ``MATCHING_INTERVAL_SECONDS`` (default 15 s).
 
 Concurrency safety
 ------------------
-* **Redis distributed lock** ensures only one instance runs the matching
-  cycle at a time across multiple API processes.
-* **SELECT … FOR UPDATE** on ``ride_groups`` within each H3 cell prevents
-  two concurrent cycles from over-booking the same group.
+* **One cycle per interval** cluster-wide: every API process starts the
+  loop, but each tick first claims ``lock:matching:cycle`` with
+  ``SET NX EX <interval>``; the others skip the pending scan entirely.
+* **Per-H3-cell Redis locks** (``lock:matching:<cell>``) ensure only one
+  instance matches a given cell at a time; different cells -- in this
+  process or across API processes -- are matched concurrently, each in
+  its own session and transaction.
+* **SELECT … FOR UPDATE** on each cell's candidate ``ride_groups`` stays
+  as defence in depth: neighbouring cells share nearby groups, so their
+  transactions serialise on those rows (locked in id order).
+* Pending rides and candidate cabs are locked with ``SKIP LOCKED`` so two
+  cells never claim the same ride or cab.
 
 Algorithm per cycle
 -------------------
-1. Fetch all PENDING rides.
-2. Bin them into H3 cells (spatial binning).
-3. For each cell, run greedy grouping: try to add each ride to an
-   existing group (capacity + luggage + detour OK) or create a new one.
-4. Assign an available cab to each new group.
+1. Fetch the ids of all PENDING rides.
+2. Bin them into H3 cells (spatial binning) -- by the ``pickup_h3``
+   column stored at insert, so no H3 calls per cycle.
+3. For each cell (concurrently), run greedy grouping: try to add each
+   ride to one of the K nearest groups within ``GROUP_SEARCH_RADIUS_M``
+   (PostGIS, capacity + luggage + detour OK) or create a new one.  The
+   checks run in a compiled kernel over SoA arrays
+   (``src.domain.matching_nb``).
+4. Assign the nearest available cab (PostGIS KNN) to each new group.
 5. Calculate dynamic price for each newly matched ride.
+6. After commit, invalidate the cached ``GET /rides/{id}`` entries.
 """
 
 from __future__ import annotations
 
 import asyncio
 import logging
-from collections import defaultdict
 
 from src.config import settings
 from src.domain.enums import RideStatus
-from src.domain.matching import detour_ok, ride_h3_cell
+from src.domain.matching_nb import CellBatch
 from src.domain.pricing import PricingEngine
+from src.infrastructure.cache import RideCache
 from src.infrastructure.database import async_session_factory
 from src.infrastructure.locks import DistributedLock
-from src.infrastructure.models import RideGroupModel
 from src.infrastructure.redis_client import get_redis
 from src.infrastructure.repositories import (
     CabRepository,
@@ -79,7 +91,8 @@ async def _loop() -> None:
     assert _stop_event is not None
     while not _stop_event.is_set():
         try:
-            await run_matching_cycle()
+            if await _claim_cycle(await get_redis()):
+                await run_matching_cycle()
         except Exception:
             logger.exception("Unhandled error in matching cycle")
         # Wait for the interval or until stop is signalled
@@ -92,151 +105,213 @@ async def _loop() -> None:
             pass  # next cycle
 
 
+async def _claim_cycle(redis) -> bool:
+    """
+    Claim this interval's cycle for the current process (``SET NX EX``).
+
+    The key is never released: it expires after one interval, so across
+    all uvicorn workers / replicas only the first to wake runs the
+    cycle, and a crashed runner is replaced on the next interval.
+    """
+    gate = DistributedLock(
+        redis, "matching:cycle", ttl_seconds=settings.matching_interval_seconds
+    )
+    return await gate.acquire()
+
+
 async def run_matching_cycle() -> int:
     """Execute one matching cycle.  Returns the number of rides matched."""
     redis = await get_redis()
-    lock = DistributedLock(redis, "matching_engine", ttl_seconds=60)
 
-    if not await lock.acquire():
-        logger.debug("Lock held by another worker – skipping cycle")
+    # 1-2. Fetch pending rides, already binned by their stored H3 cell,
+    # and the free-cab count concurrently
+    cell_rides, available_cabs = await asyncio.gather(
+        _read(lambda s: RideRepository(s).get_pending_ids_by_cell()),
+        _read(lambda s: CabRepository(s).count_available()),
+    )
+    if not cell_rides:
         return 0
+    active_requests = sum(len(ids) for ids in cell_rides.values())
+
+    # 3-6. Cells are independent: match them concurrently, each under its
+    # own lock and transaction, bounded so the connection pool is not drained
+    limit = asyncio.Semaphore(settings.matching_max_concurrent_cells)
+    pricing = PricingEngine(settings.base_fare, settings.rate_per_km)
+    # Demand and supply are fixed for the cycle, so is the surge
+    surge = PricingEngine.compute_surge(active_requests, max(available_cabs, 1))
+
+    async def bounded(cell: str, ride_ids: list[int]) -> int:
+        async with limit:
+            return await _match_cell(redis, cell, ride_ids, pricing, surge)
+
+    results = await asyncio.gather(
+        *(bounded(cell, ride_ids) for cell, ride_ids in cell_rides.items()),
+        return_exceptions=True,
+    )
 
     matched = 0
+    for cell, result in zip(cell_rides, results):
+        if isinstance(result, BaseException):
+            logger.error("Error matching cell %s", cell, exc_info=result)
+        else:
+            matched += result
+    if matched:
+        logger.info("Matching cycle: %d rides matched", matched)
+    return matched
+
+
+async def _read(query):
+    """
+    Run *query(session)* in its own short-lived session.  asyncpg runs one
+    statement per connection at a time, so concurrent reads each need one.
+    """
+    async with async_session_factory() as session:
+        return await query(session)
+
+
+async def _match_cell(
+    redis,
+    cell: str,
+    ride_ids: list[int],
+    pricing: PricingEngine,
+    surge: float,
+) -> int:
+    """Greedy grouping for one H3 cell.  Returns the number of rides matched."""
+    lock = DistributedLock(
+        redis, f"matching:{cell}", ttl_seconds=settings.matching_cell_lock_ttl_seconds
+    )
+    if not await lock.acquire():
+        logger.debug("Cell %s locked by another worker – skipping", cell)
+        return 0
+
+    matched_ids: list[int] = []
     try:
         async with async_session_factory() as session:
             ride_repo = RideRepository(session)
             group_repo = RideGroupRepository(session)
             cab_repo = CabRepository(session)
-            pricing = PricingEngine(settings.base_fare, settings.rate_per_km)
 
-            # 1. Fetch pending rides
-            pending = await ride_repo.get_pending_rides()
-            if not pending:
-                await session.commit()
+            # Re-read under row locks: rides cancelled or claimed since the
+            # cycle's snapshot drop out here
+            rides_in_cell = await ride_repo.get_pending_by_ids_for_update(ride_ids)
+            if not rides_in_cell:
                 return 0
 
-            active_requests = len(pending)
-            available_cabs = await cab_repo.count_available()
+            # Candidate groups: nearest groups with a pickup around the
+            # cell's pending rides (PostGIS ST_DWithin + KNN), which also
+            # catches groups just across an H3 boundary
+            groups = await group_repo.get_candidates_near(
+                sum(r.pickup_lat for r in rides_in_cell) / len(rides_in_cell),
+                sum(r.pickup_lng for r in rides_in_cell) / len(rides_in_cell),
+                radius_m=settings.group_search_radius_m,
+                k=settings.group_candidates_k,
+            )
+
+            # Pack rides and groups (from the eagerly loaded rides -- no
+            # per-group queries) into SoA columns for the compiled kernel
+            batch = CellBatch(
+                [
+                    (r.pickup_lat, r.pickup_lng, r.dropoff_lat, r.dropoff_lng,
+                     r.seats_requested, r.luggage_count)
+                    for r in rides_in_cell
+                ],
+                [
+                    (
+                        g.cab.max_seats if g.cab else 4,
+                        g.cab.max_luggage if g.cab else 3,
+                        g.seats_occupied,
+                        g.luggage_occupied,
+                        [(r.pickup_lat, r.pickup_lng, r.dropoff_lat, r.dropoff_lng)
+                         for r in g.rides],
+                    )
+                    for g in groups
+                ],
+            )
 
-            # 2. Spatial binning
-            cell_rides: dict[str, list] = defaultdict(list)
-            for ride in pending:
-                cell = ride_h3_cell(
-                    ride.pickup_lat, ride.pickup_lng, settings.h3_resolution
+            # The kernel stops at each ride that fits no group; open a new
+            # group for it with the nearest available cab (falling back to
+            # the nearest one outside the radius) and resume.  New groups
+            # and taken cabs are only written once the cell is done; cabs
+            # taken so far are excluded from later lookups instead of being
+            # flushed one by one.
+            new_groups: list[dict] = []
+            taken_cabs: list[int] = []
+            i = batch.match(0, settings.detour_tolerance)
+            while i < len(rides_in_cell):
+                ride = rides_in_cell[i]
+                cabs = await cab_repo.nearest_available_cabs(
+                    ride.pickup_lat,
+                    ride.pickup_lng,
+                    k=1,
+                    radius_m=settings.cab_search_radius_m,
+                    exclude=taken_cabs,
                 )
-                cell_rides[cell].append(ride)
-
-            # 3. Greedy grouping per cell
-            for cell, rides_in_cell in cell_rides.items():
-                groups = await group_repo.get_active_groups_for_update(h3_cell=cell)
-
-                # Pre-load existing ride data for each group
-                gdata: dict[int, dict] = {}
-                for g in groups:
-                    existing = await ride_repo.get_rides_in_group(g.id)
-                    gdata[g.id] = {
-                        "pickups": [(r.pickup_lat, r.pickup_lng) for r in existing],
-                        "dropoffs": [
-                            (r.dropoff_lat, r.dropoff_lng) for r in existing
-                        ],
+                if not cabs:
+                    cabs = await cab_repo.nearest_available_cabs(
+                        ride.pickup_lat,
+                        ride.pickup_lng,
+                        k=1,
+                        radius_m=None,
+                        exclude=taken_cabs,
+                    )
+                cab = cabs[0] if cabs else None
+                if cab:
+                    taken_cabs.append(cab.id)
+
+                new_groups.append(
+                    {
+                        "cab_id": cab.id if cab else None,
+                        "status": "ACTIVE",
+                        "h3_cell": cell,
                     }
-
-                for ride in rides_in_cell:
-                    placed = False
-
-                    for g in groups:
-                        cab = (
-                            await cab_repo.get_by_id(g.cab_id) if g.cab_id else None
-                        )
-                        max_s = cab.max_seats if cab else 4
-                        max_l = cab.max_luggage if cab else 3
-
-                        # Capacity check
-                        if (
-                            g.seats_occupied + ride.seats_requested > max_s
-                            or g.luggage_occupied + ride.luggage_count > max_l
-                        ):
-                            continue
-
-                        # Detour check
-                        if not detour_ok(
-                            gdata[g.id]["pickups"],
-                            gdata[g.id]["dropoffs"],
-                            (ride.pickup_lat, ride.pickup_lng),
-                            (ride.dropoff_lat, ride.dropoff_lng),
-                            tolerance=settings.detour_tolerance,
-                        ):
-                            continue
-
-                        # ✓ Match
-                        g.seats_occupied += ride.seats_requested
-                        g.luggage_occupied += ride.luggage_count
-                        gdata[g.id]["pickups"].append(
-                            (ride.pickup_lat, ride.pickup_lng)
-                        )
-                        gdata[g.id]["dropoffs"].append(
-                            (ride.dropoff_lat, ride.dropoff_lng)
-                        )
-
-                        position = len(gdata[g.id]["pickups"])
-                        ride.status = RideStatus.MATCHED
-                        ride.ride_group_id = g.id
-                        ride.price = pricing.calculate_price(
-                            ride.pickup_lat,
-                            ride.pickup_lng,
-                            ride.dropoff_lat,
-                            ride.dropoff_lng,
-                            passenger_position=position,
-                            active_requests=active_requests,
-                            available_cabs=max(available_cabs, 1),
-                        )
-                        matched += 1
-                        placed = True
-                        break
-
-                    if not placed:
-                        # Create a new group with the next available cab
-                        cabs = await cab_repo.get_available()
-                        cab = cabs[0] if cabs else None
-
-                        new_group = RideGroupModel(
-                            cab_id=cab.id if cab else None,
-                            seats_occupied=ride.seats_requested,
-                            luggage_occupied=ride.luggage_count,
-                            status="ACTIVE",
-                            h3_cell=cell,
-                        )
-                        new_group = await group_repo.create(new_group)
-
-                        if cab:
-                            cab.is_available = False
-
-                        ride.status = RideStatus.MATCHED
-                        ride.ride_group_id = new_group.id
-                        ride.price = pricing.calculate_price(
-                            ride.pickup_lat,
-                            ride.pickup_lng,
-                            ride.dropoff_lat,
-                            ride.dropoff_lng,
-                            passenger_position=1,
-                            active_requests=active_requests,
-                            available_cabs=max(available_cabs, 1),
-                        )
-                        matched += 1
-
-                        # Track for subsequent iterations in this cycle
-                        groups.append(new_group)
-                        gdata[new_group.id] = {
-                            "pickups": [(ride.pickup_lat, ride.pickup_lng)],
-                            "dropoffs": [(ride.dropoff_lat, ride.dropoff_lng)],
-                        }
+                )
+                batch.open_group(
+                    i,
+                    cab.max_seats if cab else 4,
+                    cab.max_luggage if cab else 3,
+                )
+                i = batch.match(i + 1, settings.detour_tolerance)
+
+            # ✓ Persist the kernel's results: one INSERT for new groups, one
+            # UPDATE for taken cabs and one executemany UPDATE each for
+            # changed groups and rides -- nothing goes through the ORM
+            # unit of work
+            changed = [
+                {
+                    "id": group.id,
+                    "seats_occupied": int(batch.seats[g]),
+                    "luggage_occupied": int(batch.luggage[g]),
+                }
+                for g, group in enumerate(groups)
+                if batch.seats[g] != group.seats_occupied
+                or batch.luggage[g] != group.luggage_occupied
+            ]
+            for g, row in enumerate(new_groups, start=len(groups)):
+                row["seats_occupied"] = int(batch.seats[g])
+                row["luggage_occupied"] = int(batch.luggage[g])
+
+            group_ids = [group.id for group in groups]
+            group_ids += await group_repo.create_many(new_groups)
+            await cab_repo.mark_unavailable(taken_cabs)
+            await group_repo.bulk_update(changed)
+            await ride_repo.bulk_update(
+                [
+                    {
+                        "id": ride.id,
+                        "status": RideStatus.MATCHED,
+                        "ride_group_id": group_ids[batch.assignment[i]],
+                        "price": pricing.calculate_price_fast(
+                            float(batch.r_direct[i]), int(batch.position[i]), surge
+                        ),
+                    }
+                    for i, ride in enumerate(rides_in_cell)
+                ]
+            )
+            matched_ids = [ride.id for ride in rides_in_cell]
 
             await session.commit()
-            if matched:
-                logger.info("Matching cycle: %d rides matched", matched)
-    except Exception:
-        logger.exception("Error in matching cycle")
     finally:
         await lock.release()
 
-    return matched
+    await RideCache(redis).invalidate(*matched_ids)
+    return len(matched_ids)
@@ -4,33 +4,79 @@ Shared test fixtures.
 Uses an in-memory SQLite database (via aiosqlite) so tests run without
 Docker / PostgreSQL / Redis.  PostGIS-specific features (Geometry columns)
 are mocked by using plain String columns in the test models.
+
+The schema is created once per session.  Each test runs inside an outer
+transaction on a single connection that is rolled back at teardown; every
+``TestSessionFactory`` session opened meanwhile (fixtures, routes, the test
+body) joins it through a SAVEPOINT, so commits stay visible within the test
+and nothing leaks into the next one.
 """
 
-import asyncio
+import os
 from typing import AsyncGenerator
 
-import pytest
 import pytest_asyncio
-from httpx import ASGITransport, AsyncClient
-from sqlalchemy import Column, DateTime, Float, Integer, String, Boolean, ForeignKey, func
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    String,
+    event,
+    func,
+)
 from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, relationship
+from sqlalchemy.pool import StaticPool
+
+
+# Rate limiter counters in process memory (no Redis in tests)
+os.environ.setdefault("RATE_LIMIT_STORAGE_URI", "memory://")
 
 
 # ── Test DB (SQLite in-memory) ────────────────────────────────────────
+# Private to this process, so pytest-xdist workers never share a database.
 
 TEST_DB_URL = "sqlite+aiosqlite:///:memory:"
 
-test_engine = create_async_engine(TEST_DB_URL, echo=False)
+# One shared connection: every session sees the same in-memory database
+test_engine = create_async_engine(
+    TEST_DB_URL,
+    poolclass=StaticPool,
+    connect_args={"check_same_thread": False},
+    echo=False,
+)
 TestSessionFactory = async_sessionmaker(
     test_engine, class_=AsyncSession, expire_on_commit=False
 )
 
 
+@event.listens_for(test_engine.sync_engine, "connect")
+def _sqlite_connect(dbapi_conn, _record):
+    # The sqlite3 driver issues its own BEGIN/COMMIT around DML, which
+    # breaks SAVEPOINT nesting; let SQLAlchemy emit BEGIN instead.
+    dbapi_conn.isolation_level = None
+    # An in-memory database has no WAL (journal_mode stays MEMORY); keep
+    # temp tables in memory and give it a 64 MB page cache.
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-64000")
+    cursor.close()
+
+
+@event.listens_for(test_engine.sync_engine, "begin")
+def _sqlite_begin(conn):
+    conn.exec_driver_sql("BEGIN")
+
+
 class TestBase(DeclarativeBase):
     pass
 
@@ -68,6 +114,8 @@ class TestRideGroupModel(TestBase):
     h3_cell = Column(String(20), nullable=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now())
+    rides = relationship("TestRideModel", lazy="raise")
+    cab = relationship("TestCabModel", lazy="raise")
 
 
 class TestRideModel(TestBase):
@@ -86,6 +134,7 @@ class TestRideModel(TestBase):
     ride_group_id = Column(Integer, ForeignKey("ride_groups.id"), nullable=True)
     idempotency_key = Column(String(64), unique=True, nullable=True)
     price = Column(Float, nullable=True)
+    pickup_h3 = Column(String(20), nullable=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now())
 
@@ -93,21 +142,69 @@ class TestRideModel(TestBase):
 # ── Fixtures ──────────────────────────────────────────────────────────
 
 
-@pytest.fixture(scope="session")
-def event_loop():
-    loop = asyncio.new_event_loop()
-    yield loop
-    loop.close()
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def _schema() -> AsyncGenerator[None, None]:
+    """Create the tables once for the whole run."""
+    async with test_engine.begin() as conn:
+        await conn.run_sync(TestBase.metadata.create_all)
+    yield
+    await test_engine.dispose()
 
 
 @pytest_asyncio.fixture
-async def db_session() -> AsyncGenerator[AsyncSession, None]:
-    """Create tables, yield a session, then drop everything."""
-    async with test_engine.begin() as conn:
-        await conn.run_sync(TestBase.metadata.create_all)
+async def db_connection(_schema) -> AsyncGenerator[AsyncConnection, None]:
+    """
+    A connection inside an outer transaction that is rolled back on
+    teardown.  ``TestSessionFactory`` is bound to it for the test, with
+    sessions joining via SAVEPOINT.
+    """
+    async with test_engine.connect() as conn:
+        transaction = await conn.begin()
+        TestSessionFactory.configure(
+            bind=conn, join_transaction_mode="create_savepoint"
+        )
+        try:
+            yield conn
+        finally:
+            TestSessionFactory.configure(
+                bind=test_engine, join_transaction_mode="conservative_savepoint"
+            )
+            await transaction.rollback()
 
+
+@pytest_asyncio.fixture
+async def db_session(db_connection) -> AsyncGenerator[AsyncSession, None]:
+    """A session whose work is undone when the test ends."""
     async with TestSessionFactory() as session:
         yield session
 
-    async with test_engine.begin() as conn:
-        await conn.run_sync(TestBase.metadata.drop_all)
+
+# ── PostgreSQL + PostGIS (``-m postgres``, needs TEST_POSTGRES_URL) ────
+
+
+@pytest_asyncio.fixture
+async def pg_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session on the production schema inside a transaction rolled back on
+    teardown.  Imported lazily so SQLite-only runs skip GeoAlchemy.
+    """
+    from sqlalchemy import text
+    from sqlalchemy.pool import NullPool
+
+    from src.infrastructure.database import Base
+
+    engine = create_async_engine(os.environ["TEST_POSTGRES_URL"], poolclass=NullPool)
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
+        await conn.run_sync(Base.metadata.create_all)
+        session = AsyncSession(
+            bind=conn, join_transaction_mode="create_savepoint",
+            expire_on_commit=False,
+        )
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+    await engine.dispose()
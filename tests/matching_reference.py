@@ -0,0 +1,72 @@
+"""
+Plain-Python reference implementation of the matcher's detour rule.
+
+Production matching runs the compiled :class:`~src.domain.matching_nb.CellBatch`
+kernel; this straightforward per-passenger walk exists only so the tests
+can check the kernel's decisions against an independent, readable model.
+"""
+
+from __future__ import annotations
+
+from src.domain.distance import haversine_km
+
+
+def detour_ok(
+    existing_pickups: list[tuple[float, float]],
+    existing_dropoffs: list[tuple[float, float]],
+    new_pickup: tuple[float, float],
+    new_dropoff: tuple[float, float],
+    tolerance: float = 0.4,
+) -> bool:
+    """
+    Check whether adding a new stop keeps *every* passenger's detour
+    within ``(1 + tolerance) x direct_distance``.
+
+    Simplified model
+    ~~~~~~~~~~~~~~~~
+    The shared route visits all pickups in order then all drop-offs in
+    order.  For each passenger *i* the "shared leg" is the distance
+    along that route from pickup_i to dropoff_i.
+
+    Complexity: O(k) where k = passengers already in the group.
+    """
+    all_pickups = existing_pickups + [new_pickup]
+    all_dropoffs = existing_dropoffs + [new_dropoff]
+
+    for i, (p, d) in enumerate(zip(all_pickups, all_dropoffs)):
+        direct = haversine_km(p[0], p[1], d[0], d[1])
+        if direct < 0.1:  # negligible distance -- skip
+            continue
+
+        total_shared = _shared_leg(all_pickups, all_dropoffs, i)
+        if total_shared > (1 + tolerance) * direct:
+            return False
+
+    return True
+
+
+def _shared_leg(
+    pickups: list[tuple[float, float]],
+    dropoffs: list[tuple[float, float]],
+    passenger_idx: int,
+) -> float:
+    """
+    Estimate the shared-route distance for passenger *passenger_idx*.
+
+    Sequential model: all pickups in index order, then all drop-offs.
+    The passenger's leg = sum of hops from their pickup position to
+    their drop-off position along the ordered stop list.
+
+    Complexity: O(k) where k = total stops.
+    """
+    stops = list(pickups) + list(dropoffs)
+    start_idx = passenger_idx
+    end_idx = len(pickups) + passenger_idx
+
+    total = 0.0
+    for j in range(start_idx, end_idx):
+        total += haversine_km(
+            stops[j][0], stops[j][1],
+            stops[j + 1][0], stops[j + 1][1],
+        )
+    return total
@@ -8,24 +8,29 @@ so the routes use test-friendly models.
 
 from __future__ import annotations
 
+from contextlib import ExitStack
 from typing import Optional
 from unittest.mock import AsyncMock, patch
 
+import orjson
 import pytest
 import pytest_asyncio
 from httpx import ASGITransport, AsyncClient
-from sqlalchemy import select, func
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from src.domain.enums import RideStatus
+from src.config import settings
+from src.domain.entities import InvalidStateTransition
+from src.domain.enums import CANCELLABLE_STATUSES, RideStatus
+from src.domain.matching import ride_h3_cell
 from tests.conftest import (
-    TestBase,
     TestCabModel,
     TestRideGroupModel,
     TestRideModel,
     TestSessionFactory,
     TestUserModel,
-    test_engine,
 )
 
 
@@ -39,24 +44,45 @@ class _TestRideRepository:
                           dropoff_lat, dropoff_lng, seats_requested=1,
                           luggage_count=0, idempotency_key=None,
                           status=RideStatus.PENDING):
-        ride = TestRideModel(
-            user_id=user_id,
-            pickup_lat=pickup_lat, pickup_lng=pickup_lng,
-            dropoff_lat=dropoff_lat, dropoff_lng=dropoff_lng,
-            pickup_point=f"POINT({pickup_lng} {pickup_lat})",
-            dropoff_point=f"POINT({dropoff_lng} {dropoff_lat})",
-            seats_requested=seats_requested,
-            luggage_count=luggage_count,
-            idempotency_key=idempotency_key,
-            status=status.value if hasattr(status, "value") else status,
+        stmt = (
+            sqlite_insert(TestRideModel)
+            .values(
+                user_id=user_id,
+                pickup_lat=pickup_lat, pickup_lng=pickup_lng,
+                dropoff_lat=dropoff_lat, dropoff_lng=dropoff_lng,
+                seats_requested=seats_requested,
+                luggage_count=luggage_count,
+                idempotency_key=idempotency_key,
+                status=status.value if hasattr(status, "value") else status,
+                pickup_h3=ride_h3_cell(
+                    pickup_lat, pickup_lng, settings.h3_resolution
+                ),
+            )
+            .on_conflict_do_nothing(index_elements=[TestRideModel.idempotency_key])
+            .returning(TestRideModel)
         )
-        self.session.add(ride)
-        await self.session.flush()
+        ride = (await self.session.scalars(stmt)).one_or_none()
+        if ride is None:
+            ride = await self.get_by_idempotency_key(idempotency_key)
         return ride
 
     async def get_by_id(self, ride_id: int) -> Optional[TestRideModel]:
         return await self.session.get(TestRideModel, ride_id)
 
+    async def get_response_by_id(self, ride_id: int) -> Optional[dict]:
+        result = await self.session.execute(
+            select(
+                TestRideModel.id, TestRideModel.user_id,
+                TestRideModel.pickup_lat, TestRideModel.pickup_lng,
+                TestRideModel.dropoff_lat, TestRideModel.dropoff_lng,
+                TestRideModel.status, TestRideModel.seats_requested,
+                TestRideModel.luggage_count, TestRideModel.ride_group_id,
+                TestRideModel.price, TestRideModel.created_at,
+            ).where(TestRideModel.id == ride_id)
+        )
+        row = result.first()
+        return dict(row._mapping) if row else None
+
     async def get_by_idempotency_key(self, key: str):
         result = await self.session.execute(
             select(TestRideModel).where(TestRideModel.idempotency_key == key)
@@ -69,6 +95,38 @@ class _TestRideRepository:
         )
         return list(result.scalars().all())
 
+    async def cancel(self, ride_id: int):
+        """Statement-by-statement equivalent of the production CTE."""
+        ride = await self.get_by_id(ride_id)
+        if not ride:
+            return None
+        if ride.status not in CANCELLABLE_STATUSES:
+            raise InvalidStateTransition(
+                f"Cannot cancel ride in status {ride.status}"
+            )
+
+        if ride.ride_group_id:
+            group = await _TestRideGroupRepository(self.session).get_by_id(
+                ride.ride_group_id
+            )
+            group.seats_occupied = max(0, group.seats_occupied - ride.seats_requested)
+            group.luggage_occupied = max(0, group.luggage_occupied - ride.luggage_count)
+            others = [
+                r for r in await self.get_rides_in_group(group.id)
+                if r.id != ride_id
+                and r.status not in (RideStatus.CANCELLED, RideStatus.COMPLETED)
+            ]
+            if not others:
+                group.status = "INACTIVE"
+                if group.cab_id:
+                    cab = await _TestCabRepository(self.session).get_by_id(group.cab_id)
+                    cab.is_available = True
+
+        ride.status = RideStatus.CANCELLED.value
+        ride.ride_group_id = None
+        await self.session.flush()
+        return await self.get_response_by_id(ride_id)
+
 
 class _TestRideGroupRepository:
     def __init__(self, session: AsyncSession):
@@ -83,6 +141,14 @@ class _TestRideGroupRepository:
         )
         return list(result.scalars().all())
 
+    async def get_active_groups_with_rides(self):
+        result = await self.session.execute(
+            select(TestRideGroupModel)
+            .options(selectinload(TestRideGroupModel.rides))
+            .where(TestRideGroupModel.status == "ACTIVE")
+        )
+        return list(result.scalars().all())
+
 
 class _TestCabRepository:
     def __init__(self, session: AsyncSession):
@@ -92,84 +158,131 @@ class _TestCabRepository:
         return await self.session.get(TestCabModel, cab_id)
 
 
-# ── Fixture ───────────────────────────────────────────────────────────
+class _InMemoryRideCache:
+    """Dict-backed stand-in for ``RideCache`` (no Redis in tests)."""
+
+    def __init__(self):
+        self.store: dict[int, bytes] = {}
+
+    async def get(self, ride_id: int):
+        return self.store.get(ride_id)
+
+    async def set(self, ride_id: int, payload: dict) -> None:
+        self.store[ride_id] = orjson.dumps(payload)
+
+    async def invalidate(self, *ride_ids: int) -> None:
+        for ride_id in ride_ids:
+            self.store.pop(ride_id, None)
 
 
-@pytest_asyncio.fixture
-async def client():
-    """AsyncClient backed by SQLite + test models."""
-    async with test_engine.begin() as conn:
-        await conn.run_sync(TestBase.metadata.create_all)
+# ── Fixtures ──────────────────────────────────────────────────────────
 
-    # Seed
+
+@pytest_asyncio.fixture(autouse=True)
+async def _seed(db_connection):
+    """User 1 and cab 1, inside the test's transaction (undone on rollback)."""
     async with TestSessionFactory() as session:
-        session.add(TestUserModel(name="Test User", email="test@example.com"))
-        session.add(TestCabModel(max_seats=4, max_luggage=3, is_available=True))
+        await session.execute(
+            insert(TestUserModel),
+            [{"name": "Test User", "email": "test@example.com"}],
+        )
+        await session.execute(
+            insert(TestCabModel),
+            [{"max_seats": 4, "max_luggage": 3, "is_available": True}],
+        )
         await session.commit()
 
-    # Override repos at the module level where routes import them
-    with (
-        patch(
-            "src.workers.matcher.start_matching_loop",
-            new_callable=AsyncMock,
-        ),
-        patch(
-            "src.workers.matcher.stop_matching_loop",
-            new_callable=AsyncMock,
-        ),
-        patch(
-            "src.api.routes.rides.RideRepository",
-            _TestRideRepository,
-        ),
-        patch(
-            "src.api.routes.rides.RideGroupRepository",
-            _TestRideGroupRepository,
-        ),
-        patch(
-            "src.api.routes.rides.CabRepository",
-            _TestCabRepository,
-        ),
-        patch(
-            "src.api.routes.admin.RideGroupRepository",
-            _TestRideGroupRepository,
-        ),
-        patch(
-            "src.api.routes.admin.RideRepository",
-            _TestRideRepository,
-        ),
+
+@pytest.fixture(scope="module")
+def app_instance():
+    """
+    One FastAPI app for this module, with the matching loop stubbed out
+    until the module's last test (later modules see the real worker).
+    Imported here rather than at module or conftest level so unit-only runs
+    (``pytest tests/test_pricing.py``) skip FastAPI and worker start-up.
+    """
+    from src.api.app import create_app
+
+    with patch("src.workers.matcher.start_matching_loop", AsyncMock()), patch(
+        "src.workers.matcher.stop_matching_loop", AsyncMock()
     ):
-        # DB session dependency
-        async def _test_db():
-            async with TestSessionFactory() as session:
-                try:
-                    yield session
-                    await session.commit()
-                except Exception:
-                    await session.rollback()
-                    raise
+        yield create_app()
 
-        from src.api.app import create_app
-        from src.api.dependencies import get_db
 
-        app = create_app()
-        app.dependency_overrides[get_db] = _test_db
+@pytest.fixture(scope="module", autouse=True)
+def _patch_repos():
+    """Swap in the test repositories where the routes import them."""
+    with ExitStack() as stack:
+        stack.enter_context(
+            patch("src.api.routes.rides.RideRepository", _TestRideRepository)
+        )
+        stack.enter_context(
+            patch(
+                "src.api.routes.admin.RideGroupRepository",
+                _TestRideGroupRepository,
+            )
+        )
+        yield
 
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as ac:
-            yield ac
 
-    async with test_engine.begin() as conn:
-        await conn.run_sync(TestBase.metadata.drop_all)
+async def _test_db():
+    """``get_db`` override: sessions join the test's transaction."""
+    async with TestSessionFactory() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="session")
+async def http_client(app_instance):
+    """One AsyncClient / ASGITransport reused by every API test."""
+    transport = ASGITransport(app=app_instance)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.fixture
+def client(app_instance, http_client, _seed):
+    """AsyncClient backed by SQLite + test models, rolled back per test."""
+    from src.api.dependencies import get_db, get_ride_cache
+
+    ride_cache = _InMemoryRideCache()
+    app_instance.dependency_overrides[get_db] = _test_db
+    app_instance.dependency_overrides[get_ride_cache] = lambda: ride_cache
+    yield http_client
+    app_instance.dependency_overrides.clear()
 
 
 # ── Tests ─────────────────────────────────────────────────────────────
 
+# Serialised once; most tests only need *a* pending ride
+_RIDE_BODY = orjson.dumps({
+    "user_id": 1,
+    "pickup_lat": 19.09,
+    "pickup_lng": 72.87,
+    "dropoff_lat": 19.12,
+    "dropoff_lng": 72.85,
+})
+_JSON_HEADERS = {"content-type": "application/json"}
+
 
 @pytest.mark.asyncio
-async def test_health(client: AsyncClient):
-    resp = await client.get("/api/v1/admin/health")
-    assert resp.status_code == 200
-    assert resp.json()["status"] == "ok"
+@pytest.mark.parametrize(
+    "path, status_code, body",
+    [
+        ("/api/v1/admin/health", 200, {"status": "ok"}),
+        ("/api/v1/rides/9999", 404, {"detail": "Ride not found"}),
+        ("/api/v1/admin/active-groups", 200, []),
+    ],
+    ids=["health", "ride-not-found", "active-groups"],
+)
+async def test_readonly_endpoint(client: AsyncClient, path, status_code, body):
+    resp = await client.get(path)
+    assert resp.status_code == status_code
+    assert resp.json() == body
 
 
 @pytest.mark.asyncio
@@ -193,8 +306,23 @@ async def test_create_ride_returns_202(client: AsyncClient):
 
 
 @pytest.mark.asyncio
-async def test_get_ride(client: AsyncClient):
-    create_resp = await client.post(
+async def test_create_ride_stores_pickup_cell(client: AsyncClient):
+    resp = await client.post(
+        "/api/v1/rides",
+        json={
+            "user_id": 1,
+            "pickup_lat": 19.0896, "pickup_lng": 72.8656,
+            "dropoff_lat": 19.1176, "dropoff_lng": 72.8490,
+        },
+    )
+    async with TestSessionFactory() as session:
+        ride = await session.get(TestRideModel, resp.json()["id"])
+    assert ride.pickup_h3 == ride_h3_cell(19.0896, 72.8656, settings.h3_resolution)
+
+
+@pytest.mark.asyncio
+async def test_create_ride_rejects_unknown_fields(client: AsyncClient):
+    resp = await client.post(
         "/api/v1/rides",
         json={
             "user_id": 1,
@@ -202,8 +330,17 @@ async def test_get_ride(client: AsyncClient):
             "pickup_lng": 72.87,
             "dropoff_lat": 19.12,
             "dropoff_lng": 72.85,
+            "seat_requested": 2,  # typo of seats_requested
         },
     )
+    assert resp.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_get_ride(client: AsyncClient):
+    create_resp = await client.post(
+        "/api/v1/rides", content=_RIDE_BODY, headers=_JSON_HEADERS
+    )
     ride_id = create_resp.json()["id"]
     resp = await client.get(f"/api/v1/rides/{ride_id}")
     assert resp.status_code == 200
@@ -211,22 +348,79 @@ async def test_get_ride(client: AsyncClient):
 
 
 @pytest.mark.asyncio
-async def test_get_ride_not_found(client: AsyncClient):
-    resp = await client.get("/api/v1/rides/9999")
-    assert resp.status_code == 404
+async def test_get_ride_served_from_cache(client: AsyncClient):
+    create_resp = await client.post(
+        "/api/v1/rides", content=_RIDE_BODY, headers=_JSON_HEADERS
+    )
+    ride_id = create_resp.json()["id"]
+    first = await client.get(f"/api/v1/rides/{ride_id}")
+
+    # Mutate behind the cache's back: the cached document is still served.
+    async with TestSessionFactory() as session:
+        ride = await session.get(TestRideModel, ride_id)
+        ride.price = 999.0
+        await session.commit()
+
+    second = await client.get(f"/api/v1/rides/{ride_id}")
+    assert second.json() == first.json()
+
+
+@pytest.mark.asyncio
+async def test_cancel_invalidates_cached_ride(client: AsyncClient):
+    create_resp = await client.post(
+        "/api/v1/rides", content=_RIDE_BODY, headers=_JSON_HEADERS
+    )
+    ride_id = create_resp.json()["id"]
+    await client.get(f"/api/v1/rides/{ride_id}")
+    await client.patch(f"/api/v1/rides/{ride_id}/cancel")
+    resp = await client.get(f"/api/v1/rides/{ride_id}")
+    assert resp.json()["status"] == "CANCELLED"
+
+
+@pytest.mark.asyncio
+async def test_cancel_invalidates_cache_after_commit(
+    client: AsyncClient, app_instance
+):
+    """A GET racing the cancel must not re-cache the uncommitted row."""
+    from src.api.dependencies import get_db, get_ride_cache
+
+    create_resp = await client.post(
+        "/api/v1/rides", content=_RIDE_BODY, headers=_JSON_HEADERS
+    )
+    ride_id = create_resp.json()["id"]
+    events: list[str] = []
+
+    async def _recording_db():
+        async with TestSessionFactory() as session:
+            commit = session.commit
+
+            async def _commit():
+                await commit()
+                events.append("commit")
+
+            session.commit = _commit
+            yield session
+            await session.commit()
+
+    cache = app_instance.dependency_overrides[get_ride_cache]()
+    invalidate = cache.invalidate
+
+    async def _invalidate(*ride_ids):
+        events.append("invalidate")
+        await invalidate(*ride_ids)
+
+    cache.invalidate = _invalidate
+    app_instance.dependency_overrides[get_db] = _recording_db
+
+    resp = await client.patch(f"/api/v1/rides/{ride_id}/cancel")
+    assert resp.status_code == 200
+    assert events.index("commit") < events.index("invalidate")
 
 
 @pytest.mark.asyncio
 async def test_cancel_pending_ride(client: AsyncClient):
     create_resp = await client.post(
-        "/api/v1/rides",
-        json={
-            "user_id": 1,
-            "pickup_lat": 19.09,
-            "pickup_lng": 72.87,
-            "dropoff_lat": 19.12,
-            "dropoff_lng": 72.85,
-        },
+        "/api/v1/rides", content=_RIDE_BODY, headers=_JSON_HEADERS
     )
     ride_id = create_resp.json()["id"]
     resp = await client.patch(f"/api/v1/rides/{ride_id}/cancel")
@@ -237,14 +431,7 @@ async def test_cancel_pending_ride(client: AsyncClient):
 @pytest.mark.asyncio
 async def test_cancel_already_cancelled_ride_fails(client: AsyncClient):
     create_resp = await client.post(
-        "/api/v1/rides",
-        json={
-            "user_id": 1,
-            "pickup_lat": 19.09,
-            "pickup_lng": 72.87,
-            "dropoff_lat": 19.12,
-            "dropoff_lng": 72.85,
-        },
+        "/api/v1/rides", content=_RIDE_BODY, headers=_JSON_HEADERS
     )
     ride_id = create_resp.json()["id"]
     await client.patch(f"/api/v1/rides/{ride_id}/cancel")
@@ -270,7 +457,57 @@ async def test_idempotency_key(client: AsyncClient):
 
 
 @pytest.mark.asyncio
-async def test_active_groups_endpoint(client: AsyncClient):
+async def test_cancel_last_ride_releases_group_and_cab(client: AsyncClient):
+    async with TestSessionFactory() as session:
+        group = TestRideGroupModel(
+            cab_id=1, seats_occupied=1, luggage_occupied=1, status="ACTIVE"
+        )
+        session.add(group)
+        await session.flush()
+        ride = TestRideModel(
+            user_id=1,
+            pickup_lat=19.09, pickup_lng=72.87,
+            dropoff_lat=19.12, dropoff_lng=72.85,
+            status="MATCHED", luggage_count=1, ride_group_id=group.id,
+        )
+        session.add(ride)
+        cab = await session.get(TestCabModel, 1)
+        cab.is_available = False
+        await session.commit()
+        ride_id, group_id = ride.id, group.id
+
+    resp = await client.patch(f"/api/v1/rides/{ride_id}/cancel")
+    assert resp.status_code == 200
+    assert resp.json()["ride_group_id"] is None
+
+    async with TestSessionFactory() as session:
+        group = await session.get(TestRideGroupModel, group_id)
+        assert (group.status, group.seats_occupied, group.luggage_occupied) == (
+            "INACTIVE", 0, 0,
+        )
+        assert (await session.get(TestCabModel, 1)).is_available
+
+
+@pytest.mark.asyncio
+async def test_active_groups_include_rides(client: AsyncClient):
+    async with TestSessionFactory() as session:
+        group_id = await session.scalar(
+            insert(TestRideGroupModel)
+            .values(cab_id=1, seats_occupied=2, status="ACTIVE")
+            .returning(TestRideGroupModel.id)
+        )
+        ride = dict(
+            user_id=1,
+            pickup_lat=19.09, pickup_lng=72.87,
+            dropoff_lat=19.12, dropoff_lng=72.85,
+            status="MATCHED", ride_group_id=group_id,
+        )
+        await session.execute(insert(TestRideModel), [ride, ride])
+        await session.commit()
+
     resp = await client.get("/api/v1/admin/active-groups")
     assert resp.status_code == 200
-    assert isinstance(resp.json(), list)
+    groups = resp.json()
+    assert len(groups) == 1
+    assert len(groups[0]["rides"]) == 2
+    assert all(r["ride_group_id"] == groups[0]["id"] for r in groups[0]["rides"])
@@ -0,0 +1,275 @@
+"""
+Production cancel statements (``_CANCEL_RIDE_SQL`` and the group release)
+against PostgreSQL.
+
+The API tests run on SQLite through a per-statement mirror of
+``RideRepository.cancel``; the real statements (FOR UPDATE target ->
+cancelled, then group lock -> release -> freed cab) only run on
+PostgreSQL + PostGIS.  Set ``TEST_POSTGRES_URL`` (``postgresql+asyncpg://...``) to run
+these against a throwaway database.  Most tests work inside a transaction
+that is rolled back; the ``TestCancelDuringMatch`` tests need two real
+transactions, so they commit and drop the schema afterwards.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from src.domain.entities import InvalidStateTransition
+from src.domain.enums import RideStatus
+from src.infrastructure.database import Base
+from src.infrastructure.models import CabModel, RideGroupModel, RideModel, UserModel
+from src.infrastructure.repositories import RideRepository
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+pytestmark = [
+    pytest.mark.postgres,
+    pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL not set"),
+]
+
+
+async def _matched_group(session: AsyncSession, riders: int):
+    """An ACTIVE group on a taken cab with *riders* MATCHED one-seat rides."""
+    user = UserModel(name="Test User", email="test@example.com")
+    cab = CabModel(max_seats=4, max_luggage=3, is_available=False)
+    session.add_all([user, cab])
+    await session.flush()
+    group = RideGroupModel(
+        cab_id=cab.id, seats_occupied=riders, luggage_occupied=riders,
+        status="ACTIVE",
+    )
+    session.add(group)
+    await session.flush()
+
+    repo = RideRepository(session)
+    rides = [
+        await repo.create_ride(
+            user_id=user.id,
+            pickup_lat=19.09, pickup_lng=72.87,
+            dropoff_lat=19.12, dropoff_lng=72.85,
+            luggage_count=1,
+        )
+        for _ in range(riders)
+    ]
+    await repo.bulk_update(
+        [
+            {"id": r.id, "status": RideStatus.MATCHED, "ride_group_id": group.id}
+            for r in rides
+        ]
+    )
+    return cab, group, rides
+
+
+async def _group_and_cab(session: AsyncSession, group_id: int, cab_id: int):
+    row = (
+        await session.execute(
+            text(
+                "SELECT g.status, g.seats_occupied, g.luggage_occupied, "
+                "c.is_available FROM ride_groups g JOIN cabs c ON c.id = g.cab_id "
+                "WHERE g.id = :g AND c.id = :c"
+            ),
+            {"g": group_id, "c": cab_id},
+        )
+    ).one()
+    return tuple(row)
+
+
+@pytest.mark.asyncio
+async def test_cancel_last_ride_releases_group_and_cab(pg_session):
+    cab, group, (ride,) = await _matched_group(pg_session, riders=1)
+
+    cancelled = await RideRepository(pg_session).cancel(ride.id)
+
+    assert cancelled["status"] == "CANCELLED"
+    assert cancelled["ride_group_id"] is None
+    assert await _group_and_cab(pg_session, group.id, cab.id) == (
+        "INACTIVE", 0, 0, True,
+    )
+
+
+@pytest.mark.asyncio
+async def test_cancel_keeps_group_with_other_live_rides(pg_session):
+    cab, group, (ride, _other) = await _matched_group(pg_session, riders=2)
+
+    await RideRepository(pg_session).cancel(ride.id)
+
+    assert await _group_and_cab(pg_session, group.id, cab.id) == (
+        "ACTIVE", 1, 1, False,
+    )
+
+
+@pytest.mark.asyncio
+async def test_cancel_releases_group_when_other_rides_completed(pg_session):
+    cab, group, (ride, done) = await _matched_group(pg_session, riders=2)
+    await RideRepository(pg_session).bulk_update(
+        [{"id": done.id, "status": RideStatus.COMPLETED}]
+    )
+
+    await RideRepository(pg_session).cancel(ride.id)
+
+    assert await _group_and_cab(pg_session, group.id, cab.id) == (
+        "INACTIVE", 1, 1, True,
+    )
+
+
+@pytest.mark.asyncio
+async def test_cancel_twice_raises(pg_session):
+    _, _, (ride,) = await _matched_group(pg_session, riders=1)
+    repo = RideRepository(pg_session)
+    await repo.cancel(ride.id)
+
+    with pytest.raises(InvalidStateTransition):
+        await repo.cancel(ride.id)
+
+
+@pytest.mark.asyncio
+async def test_cancel_unknown_ride_returns_none(pg_session):
+    assert await RideRepository(pg_session).cancel(999_999) is None
+
+
+# Each of these holds the matcher's locks on one connection and cancels on
+# another, so the cancel has to wait for the matcher's commit.
+
+
+@pytest_asyncio.fixture
+async def pg_engine() -> AsyncGenerator[AsyncEngine, None]:
+    """Engine on a committed schema, dropped on teardown."""
+    engine = create_async_engine(POSTGRES_URL, poolclass=NullPool)
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        yield engine
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+
+async def _wait_until_blocked(engine: AsyncEngine, timeout: float = 5.0) -> None:
+    """Return once some backend is waiting on a row lock."""
+    async with engine.connect() as conn:
+        for _ in range(int(timeout / 0.05)):
+            waiting = await conn.scalar(
+                text("SELECT count(*) FROM pg_locks WHERE NOT granted")
+            )
+            if waiting:
+                return
+            await conn.rollback()
+            await asyncio.sleep(0.05)
+    raise AssertionError("cancel never blocked on the matcher's lock")
+
+
+async def _cancel_in_background(engine: AsyncEngine, ride_id: int):
+    async def run():
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            ride = await RideRepository(session).cancel(ride_id)
+            await session.commit()
+            return ride
+
+    task = asyncio.create_task(run())
+    await _wait_until_blocked(engine)
+    return task
+
+
+class TestCancelDuringMatch:
+    @pytest.mark.asyncio
+    async def test_cancel_of_ride_being_matched_releases_new_group(self, pg_engine):
+        async with AsyncSession(pg_engine, expire_on_commit=False) as session:
+            user = UserModel(name="Test User", email="test@example.com")
+            cab = CabModel(max_seats=4, max_luggage=3, is_available=True)
+            session.add_all([user, cab])
+            await session.flush()
+            ride = await RideRepository(session).create_ride(
+                user_id=user.id,
+                pickup_lat=19.09, pickup_lng=72.87,
+                dropoff_lat=19.12, dropoff_lng=72.85,
+                luggage_count=1,
+            )
+            await session.commit()
+
+        # Matcher: lock the PENDING ride, open a group for it on the cab.
+        async with pg_engine.connect() as matcher:
+            await matcher.execute(
+                text("SELECT id FROM rides WHERE id = :r FOR UPDATE"), {"r": ride.id}
+            )
+            group_id = await matcher.scalar(
+                text(
+                    "INSERT INTO ride_groups (cab_id, seats_occupied, "
+                    "luggage_occupied, status) VALUES (:c, 1, 1, 'ACTIVE') "
+                    "RETURNING id"
+                ),
+                {"c": cab.id},
+            )
+            await matcher.execute(
+                text(
+                    "UPDATE rides SET status = 'MATCHED', ride_group_id = :g "
+                    "WHERE id = :r"
+                ),
+                {"g": group_id, "r": ride.id},
+            )
+            await matcher.execute(
+                text("UPDATE cabs SET is_available = false WHERE id = :c"),
+                {"c": cab.id},
+            )
+
+            task = await _cancel_in_background(pg_engine, ride.id)
+            await matcher.commit()
+
+        cancelled = await task
+        assert cancelled["status"] == "CANCELLED"
+        async with AsyncSession(pg_engine) as session:
+            assert await _group_and_cab(session, group_id, cab.id) == (
+                "INACTIVE", 0, 0, True,
+            )
+
+    @pytest.mark.asyncio
+    async def test_cancel_sees_ride_matched_into_group_while_waiting(self, pg_engine):
+        async with AsyncSession(pg_engine, expire_on_commit=False) as session:
+            cab, group, (ride,) = await _matched_group(session, riders=1)
+            joining = await RideRepository(session).create_ride(
+                user_id=ride.user_id,
+                pickup_lat=19.09, pickup_lng=72.87,
+                dropoff_lat=19.12, dropoff_lng=72.85,
+                luggage_count=1,
+            )
+            await session.commit()
+
+        # Matcher: lock the group and add a second rider to it.
+        async with pg_engine.connect() as matcher:
+            await matcher.execute(
+                text("SELECT id FROM ride_groups WHERE id = :g FOR UPDATE"),
+                {"g": group.id},
+            )
+            await matcher.execute(
+                text(
+                    "UPDATE rides SET status = 'MATCHED', ride_group_id = :g "
+                    "WHERE id = :r"
+                ),
+                {"g": group.id, "r": joining.id},
+            )
+            await matcher.execute(
+                text(
+                    "UPDATE ride_groups SET seats_occupied = 2, "
+                    "luggage_occupied = 2 WHERE id = :g"
+                ),
+                {"g": group.id},
+            )
+
+            task = await _cancel_in_background(pg_engine, ride.id)
+            await matcher.commit()
+
+        await task
+        async with AsyncSession(pg_engine) as session:
+            assert await _group_and_cab(session, group.id, cab.id) == (
+                "ACTIVE", 1, 1, False,
+            )
@@ -5,15 +5,15 @@ Demonstrates:
 1. Idempotency keys prevent double-booking on network retries.
 2. Ride group entity's ``can_accommodate`` correctly rejects over-capacity.
 3. Distributed lock prevents simultaneous acquire.
+4. Only one process runs each matching cycle.
 """
 
 from __future__ import annotations
 
-import asyncio
 from unittest.mock import AsyncMock
 
 import pytest
-import pytest_asyncio
+from redis.exceptions import NoScriptError
 
 from src.domain.entities import RideGroup
 from src.infrastructure.locks import DistributedLock
@@ -35,30 +35,64 @@ class TestRideGroupConcurrency:
         assert group.can_accommodate(seats=1, luggage=1, max_seats=4, max_luggage=3)
 
 
+@pytest.fixture(scope="module")
+def mock_redis_factory():
+    """Builds a fresh mocked Redis client with the lock commands stubbed."""
+
+    def make(set_return=True, evalsha=1, eval_return=1):
+        mock_redis = AsyncMock()
+        mock_redis.set = AsyncMock(return_value=set_return)
+        if isinstance(evalsha, BaseException):
+            mock_redis.evalsha = AsyncMock(side_effect=evalsha)
+        else:
+            mock_redis.evalsha = AsyncMock(return_value=evalsha)
+        mock_redis.eval = AsyncMock(return_value=eval_return)
+        return mock_redis
+
+    return make
+
+
 class TestDistributedLock:
     """Tests the Redis distributed lock logic (mocked Redis)."""
 
     @pytest.mark.asyncio
-    async def test_acquire_succeeds(self):
-        mock_redis = AsyncMock()
-        mock_redis.set = AsyncMock(return_value=True)
+    async def test_acquire_succeeds(self, mock_redis_factory):
+        lock = DistributedLock(mock_redis_factory(), "test-key", ttl_seconds=10)
+        assert await lock.acquire() is True
+
+    @pytest.mark.asyncio
+    async def test_acquire_sets_raw_bytes_token(self, mock_redis_factory):
+        mock_redis = mock_redis_factory()
 
         lock = DistributedLock(mock_redis, "test-key", ttl_seconds=10)
-        assert await lock.acquire() is True
+        await lock.acquire()
+
+        mock_redis.set.assert_called_once_with(
+            "lock:test-key", lock.token, nx=True, ex=10
+        )
+        assert isinstance(lock.token, bytes) and len(lock.token) == 16
 
     @pytest.mark.asyncio
-    async def test_acquire_fails_if_held(self):
-        mock_redis = AsyncMock()
-        mock_redis.set = AsyncMock(return_value=False)
+    async def test_acquire_fails_if_held(self, mock_redis_factory):
+        mock_redis = mock_redis_factory(set_return=False)
 
         lock = DistributedLock(mock_redis, "test-key", ttl_seconds=10)
         assert await lock.acquire() is False
 
     @pytest.mark.asyncio
-    async def test_release_calls_eval(self):
-        mock_redis = AsyncMock()
-        mock_redis.set = AsyncMock(return_value=True)
-        mock_redis.eval = AsyncMock(return_value=1)
+    async def test_release_calls_evalsha(self, mock_redis_factory):
+        mock_redis = mock_redis_factory()
+
+        lock = DistributedLock(mock_redis, "test-key", ttl_seconds=10)
+        await lock.acquire()
+        await lock.release()
+
+        mock_redis.evalsha.assert_called_once()
+        mock_redis.eval.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_release_falls_back_to_eval_on_noscript(self, mock_redis_factory):
+        mock_redis = mock_redis_factory(evalsha=NoScriptError("NOSCRIPT"))
 
         lock = DistributedLock(mock_redis, "test-key", ttl_seconds=10)
         await lock.acquire()
@@ -67,11 +101,35 @@ class TestDistributedLock:
         mock_redis.eval.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_context_manager_acquire_fail_raises(self):
-        mock_redis = AsyncMock()
-        mock_redis.set = AsyncMock(return_value=False)
+    async def test_context_manager_acquire_fail_raises(self, mock_redis_factory):
+        mock_redis = mock_redis_factory(set_return=False)
 
         lock = DistributedLock(mock_redis, "test-key", ttl_seconds=10)
         with pytest.raises(RuntimeError, match="Could not acquire lock"):
             async with lock:
                 pass
+
+
+class TestMatchingCycleGate:
+    """Only one process per interval runs the matching cycle."""
+
+    @pytest.mark.asyncio
+    async def test_claims_interval_with_set_nx_ex(self, mock_redis_factory):
+        from src.config import settings
+        from src.workers.matcher import _claim_cycle
+
+        mock_redis = mock_redis_factory()
+        assert await _claim_cycle(mock_redis) is True
+        key, _token = mock_redis.set.call_args.args
+        assert key == "lock:matching:cycle"
+        assert mock_redis.set.call_args.kwargs == {
+            "nx": True, "ex": settings.matching_interval_seconds,
+        }
+
+    @pytest.mark.asyncio
+    async def test_skips_when_another_process_holds_it(self, mock_redis_factory):
+        from src.workers.matcher import _claim_cycle
+
+        mock_redis = mock_redis_factory(set_return=False)
+        assert await _claim_cycle(mock_redis) is False
+        mock_redis.evalsha.assert_not_called()  # never released
@@ -0,0 +1,199 @@
+"""
+Matching worker orchestration (``run_matching_cycle`` / ``_match_cell``).
+
+The repositories' queries are PostgreSQL + PostGIS only, so the worker runs
+against in-memory stand-ins with the same method signatures.  Cab lookups
+honour ``radius_m`` and ``exclude`` but never change availability, so the
+worker's own ``taken_cabs`` bookkeeping is what keeps a cab from being
+assigned twice.
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from unittest.mock import ANY, AsyncMock
+
+import pytest
+
+import src.workers.matcher as matcher
+from src.config import settings
+from src.domain.distance import haversine_km
+from src.domain.enums import RideStatus
+from src.domain.matching import ride_h3_cell
+
+AIRPORT = (19.0896, 72.8656)
+CELL = ride_h3_cell(*AIRPORT, 7)
+
+
+def _ride(ride_id, dropoff, seats=1, luggage=0, status=RideStatus.PENDING):
+    return SimpleNamespace(
+        id=ride_id, pickup_lat=AIRPORT[0], pickup_lng=AIRPORT[1],
+        dropoff_lat=dropoff[0], dropoff_lng=dropoff[1],
+        seats_requested=seats, luggage_count=luggage, status=status,
+    )
+
+
+def _cab(cab_id, lat, lng, available=True):
+    return SimpleNamespace(
+        id=cab_id, lat=lat, lng=lng, max_seats=4, max_luggage=3,
+        is_available=available,
+    )
+
+
+class _World:
+    """Database state plus a log of commits and cache invalidations."""
+
+    def __init__(self):
+        self.events: list = []
+        self.cabs = {
+            100: _cab(100, *AIRPORT, available=False),  # serving group 10
+            200: _cab(200, *AIRPORT),                    # nearest free cab
+            400: _cab(400, 19.40, 72.87),                # ~35 km away
+        }
+        # Group 10 already carries ride 1 to the north-east
+        self.group = SimpleNamespace(
+            id=10, cab=self.cabs[100], seats_occupied=1, luggage_occupied=0,
+            rides=[_ride(1, (19.20, 72.95), status=RideStatus.MATCHED)],
+        )
+        self.pending = {
+            2: _ride(2, (19.201, 72.951), luggage=1),  # same way as ride 1
+            3: _ride(3, (18.90, 72.75)),               # opposite direction
+            4: _ride(4, (19.201, 72.951), seats=4),    # fits no group
+        }
+        self.created_groups: list[dict] = []
+        self.group_updates: list[dict] = []
+        self.ride_updates: list[dict] = []
+        self.taken_cabs: list[int] = []
+
+
+class _Session:
+    def __init__(self, world):
+        self.world = world
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        self.world.events.append("commit")
+
+
+class _RideRepository:
+    def __init__(self, session):
+        self.world = session.world
+
+    async def get_pending_ids_by_cell(self):
+        return {CELL: list(self.world.pending)}
+
+    async def get_pending_by_ids_for_update(self, ride_ids):
+        return [self.world.pending[i] for i in ride_ids if i in self.world.pending]
+
+    async def bulk_update(self, rows):
+        self.world.ride_updates.extend(rows)
+
+
+class _RideGroupRepository:
+    def __init__(self, session):
+        self.world = session.world
+
+    async def get_candidates_near(self, lat, lng, radius_m, k):
+        return [self.world.group]
+
+    async def create_many(self, rows):
+        first = 11 + len(self.world.created_groups)
+        self.world.created_groups.extend(rows)
+        return list(range(first, first + len(rows)))
+
+    async def bulk_update(self, rows):
+        self.world.group_updates.extend(rows)
+
+
+class _CabRepository:
+    def __init__(self, session):
+        self.world = session.world
+
+    async def count_available(self):
+        return sum(c.is_available for c in self.world.cabs.values())
+
+    async def nearest_available_cabs(self, lat, lng, k=1, radius_m=5_000.0,
+                                     exclude=()):
+        def metres(c):
+            return haversine_km(lat, lng, c.lat, c.lng) * 1e3
+
+        cabs = [
+            c for c in self.world.cabs.values()
+            if c.is_available and c.id not in exclude
+            and (radius_m is None or metres(c) <= radius_m)
+        ]
+        return sorted(cabs, key=metres)[:k]
+
+    async def mark_unavailable(self, cab_ids):
+        self.world.taken_cabs.extend(cab_ids)
+
+
+@pytest.fixture
+def world(monkeypatch):
+    """Point the worker at the in-memory repositories, session and cache."""
+    state = _World()
+    redis = AsyncMock()
+    redis.set = AsyncMock(return_value=True)
+    redis.evalsha = AsyncMock(return_value=1)
+    state.redis = redis
+
+    class _Cache:
+        def __init__(self, _redis):
+            pass
+
+        async def invalidate(self, *ride_ids):
+            state.events.append(("invalidate", set(ride_ids)))
+
+    monkeypatch.setattr(matcher, "get_redis", AsyncMock(return_value=redis))
+    monkeypatch.setattr(matcher, "async_session_factory", lambda: _Session(state))
+    monkeypatch.setattr(matcher, "RideRepository", _RideRepository)
+    monkeypatch.setattr(matcher, "RideGroupRepository", _RideGroupRepository)
+    monkeypatch.setattr(matcher, "CabRepository", _CabRepository)
+    monkeypatch.setattr(matcher, "RideCache", _Cache)
+    return state
+
+
+class TestMatchingCycle:
+    @pytest.mark.asyncio
+    async def test_cycle_persists_kernel_results(self, world):
+        assert await matcher.run_matching_cycle() == 3
+
+        # Ride 2 joins group 10: its new load is written back
+        assert world.group_updates == [
+            {"id": 10, "seats_occupied": 2, "luggage_occupied": 1}
+        ]
+
+        # Rides 3 and 4 each open a group; the second falls back to the
+        # distant cab rather than reusing the one just taken
+        assert world.created_groups == [
+            {"cab_id": 200, "status": "ACTIVE", "h3_cell": CELL,
+             "seats_occupied": 1, "luggage_occupied": 0},
+            {"cab_id": 400, "status": "ACTIVE", "h3_cell": CELL,
+             "seats_occupied": 4, "luggage_occupied": 0},
+        ]
+        assert world.taken_cabs == [200, 400]
+
+        rides = {row["id"]: row for row in world.ride_updates}
+        assert {i: row["ride_group_id"] for i, row in rides.items()} == {
+            2: 10, 3: 11, 4: 12,
+        }
+        assert all(row["status"] == RideStatus.MATCHED for row in rides.values())
+        assert all(row["price"] > 0 for row in rides.values())
+
+    @pytest.mark.asyncio
+    async def test_cache_invalidated_after_commit(self, world):
+        await matcher.run_matching_cycle()
+        assert world.events == ["commit", ("invalidate", {2, 3, 4})]
+
+    @pytest.mark.asyncio
+    async def test_cell_lock_ttl_from_settings(self, world, monkeypatch):
+        monkeypatch.setattr(settings, "matching_cell_lock_ttl_seconds", 90)
+        await matcher.run_matching_cycle()
+        world.redis.set.assert_any_await(
+            f"lock:matching:{CELL}", ANY, nx=True, ex=90
+        )
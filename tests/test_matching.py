@@ -1,9 +1,20 @@
 """Unit tests for the matching / detour algorithm."""
 
+from functools import lru_cache
+from types import SimpleNamespace
+
+import numpy as np
 import pytest
 
-from src.domain.matching import detour_ok, ride_h3_cell, _shared_leg
-from src.domain.distance import haversine_km
+from src.domain.matching import (
+    bin_rides_by_cell,
+    ride_h3_cell,
+    ride_h3_cells,
+)
+from src.domain.matching_nb import CellBatch
+from src.domain.distance_nb import haversine_km as haversine_km_nb
+from src.domain.distance import haversine_km, haversine_km_array
+from tests.matching_reference import detour_ok
 
 
 class TestHaversine:
@@ -20,30 +31,85 @@ class TestHaversine:
         d2 = haversine_km(20.0, 73.0, 19.0, 72.0)
         assert abs(d1 - d2) < 1e-6
 
+    def test_batch_matches_scalar(self):
+        lats, lngs = [19.1176, 19.0760, 19.0896], [72.8490, 72.8777, 72.8656]
+        batch = haversine_km_array(19.0896, 72.8656, lats, lngs)
+        for d, lat, lng in zip(batch, lats, lngs):
+            assert abs(d - haversine_km(19.0896, 72.8656, lat, lng)) < 1e-2
+
+    def test_elementwise_matches_scalar_on_random_points(self):
+        rng = np.random.default_rng(0)
+        lat1, lat2 = rng.uniform(-90, 90, (2, 10_000))
+        lng1, lng2 = rng.uniform(-180, 180, (2, 10_000))
+        d = haversine_km_array(lat1, lng1, lat2, lng2, dtype=np.float64)
+        assert d.shape == (10_000,)
+        sample = rng.choice(10_000, 100, replace=False)
+        expected = [haversine_km(lat1[i], lng1[i], lat2[i], lng2[i]) for i in sample]
+        assert np.allclose(d[sample], expected, rtol=0, atol=1e-9)
+
+    def test_matrix_shape_and_values(self):
+        lats1, lngs1 = [19.0896, 19.0900], [72.8656, 72.8660]
+        lats2, lngs2 = [19.1176, 19.0760, 19.0540], [72.8490, 72.8777, 72.8400]
+        m = haversine_km_array(
+            np.asarray(lats1)[:, None], np.asarray(lngs1)[:, None], lats2, lngs2
+        )
+        assert m.shape == (2, 3)
+        assert abs(m[1, 2] - haversine_km(19.0900, 72.8660, 19.0540, 72.8400)) < 1e-2
+
+    def test_compiled_scalar_matches_reference(self):
+        assert haversine_km_nb(19.0896, 72.8656, 28.6139, 77.2090) == pytest.approx(
+            haversine_km(19.0896, 72.8656, 28.6139, 77.2090)
+        )
+
+
+@pytest.fixture(scope="module")
+def mumbai_cell():
+    """Res-7 cell of the Mumbai airport pickup used across the H3 tests."""
+    return ride_h3_cell(19.0896, 72.8656, 7)
+
 
 class TestH3Cell:
-    def test_returns_string(self):
-        cell = ride_h3_cell(19.0896, 72.8656, 7)
-        assert isinstance(cell, str)
-        assert len(cell) > 0
+    def test_returns_string(self, mumbai_cell):
+        assert isinstance(mumbai_cell, str)
+        assert len(mumbai_cell) > 0
 
-    def test_nearby_points_same_cell(self):
+    def test_nearby_points_same_cell(self, mumbai_cell):
         """Two points 100m apart should be in the same H3 res-7 cell."""
-        c1 = ride_h3_cell(19.0896, 72.8656, 7)
-        c2 = ride_h3_cell(19.0897, 72.8657, 7)
-        assert c1 == c2
+        assert ride_h3_cell(19.0897, 72.8657, 7) == mumbai_cell
 
-    def test_distant_points_different_cell(self):
+    def test_distant_points_different_cell(self, mumbai_cell):
         """Mumbai vs Delhi should be different cells."""
-        c1 = ride_h3_cell(19.0896, 72.8656, 7)
-        c2 = ride_h3_cell(28.6139, 77.2090, 7)
-        assert c1 != c2
+        assert ride_h3_cell(28.6139, 77.2090, 7) != mumbai_cell
+
+    def test_batch_cells_match_scalar(self):
+        lats = [19.0896, 19.0897, 28.6139]
+        lngs = [72.8656, 72.8657, 77.2090]
+        assert ride_h3_cells(lats, lngs, 7) == [
+            ride_h3_cell(lat, lng, 7) for lat, lng in zip(lats, lngs)
+        ]
+
+    def test_bin_rides_by_cell(self, mumbai_cell):
+        rides = [
+            SimpleNamespace(pickup_lat=19.0896, pickup_lng=72.8656),
+            SimpleNamespace(pickup_lat=28.6139, pickup_lng=77.2090),
+            SimpleNamespace(pickup_lat=19.0897, pickup_lng=72.8657),
+        ]
+        bins = bin_rides_by_cell(rides, 7)
+        assert len(bins) == 2
+        assert bins[mumbai_cell] == [rides[0], rides[2]]
+
+
+def _kernel_accepts(existing_p, existing_d, new_p, new_d, tolerance):
+    """Offer one ride to one existing group through the compiled kernel."""
+    stops = [(*p, *d) for p, d in zip(existing_p, existing_d)]
+    batch = CellBatch([(*new_p, *new_d, 1, 0)], [(8, 8, 0, 0, stops)])
+    return batch.match(0, tolerance) == 1
 
 
 class TestDetourOk:
     def test_single_passenger_always_ok(self):
         """With no existing passengers, detour = 0 => always OK."""
-        assert detour_ok([], [], (19.09, 72.87), (19.12, 72.85), tolerance=0.4)
+        assert _kernel_accepts([], [], (19.09, 72.87), (19.12, 72.85), tolerance=0.4)
 
     def test_nearby_dropoffs_accepted(self):
         """Two passengers going nearly the same direction."""
@@ -51,7 +117,7 @@ class TestDetourOk:
         existing_d = [(19.1176, 72.8490)]
         new_p = (19.0900, 72.8660)
         new_d = (19.1180, 72.8500)
-        assert detour_ok(existing_p, existing_d, new_p, new_d, tolerance=0.4)
+        assert _kernel_accepts(existing_p, existing_d, new_p, new_d, tolerance=0.4)
 
     def test_opposite_direction_rejected(self):
         """Two passengers going opposite directions => large detour."""
@@ -59,13 +125,105 @@ class TestDetourOk:
         existing_d = [(19.2000, 72.9500)]  # far north-east
         new_p = (19.0896, 72.8656)
         new_d = (18.9000, 72.7500)  # far south-west
-        assert not detour_ok(existing_p, existing_d, new_p, new_d, tolerance=0.4)
+        assert not _kernel_accepts(existing_p, existing_d, new_p, new_d, tolerance=0.4)
+
+    def test_matches_scalar_reference(self):
+        """The kernel agrees with the per-passenger ``_shared_leg`` walk."""
+        rng = np.random.default_rng(7)
+        for _ in range(50):
+            k = int(rng.integers(1, 5))
+            pts = 19.09 + rng.normal(scale=0.03, size=(2 * k, 2)) + [0, 53.78]
+            pickups = [tuple(p) for p in pts[:k]]
+            dropoffs = [tuple(d) for d in pts[k:]]
+
+            args = (pickups[:-1], dropoffs[:-1], pickups[-1], dropoffs[-1], 0.4)
+            assert _kernel_accepts(*args) == detour_ok(*args)
+
+    def test_memoised_haversine_matches_kernel(self, monkeypatch):
+        """Repeated stops (e.g. cell centroids) can be served from a cache."""
+        import tests.matching_reference as reference
+
+        rng = np.random.default_rng(11)
+        pts = 19.09 + rng.normal(scale=0.03, size=(6, 2)) + [0, 53.78]
+        pts = [tuple(p) for p in pts]
+        cases = [(pts[:k], pts[3:3 + k], pts[k], pts[3 + k], 0.4) for k in (1, 2)] * 3
+
+        cached = lru_cache(maxsize=4096)(reference.haversine_km)
+        monkeypatch.setattr(reference, "haversine_km", cached)
+        assert [detour_ok(*case) for case in cases] == [
+            _kernel_accepts(*case) for case in cases
+        ]
+        assert cached.cache_info().hits > 0
+
+
+def _greedy_reference(rides, tolerance, new_caps=(4, 3)):
+    """Plain-Python greedy grouping over ``detour_ok`` (no existing groups)."""
+    groups, loads, out = [], [], []
+    for plat, plng, dlat, dlng, seats, lug in rides:
+        pickup, dropoff = (plat, plng), (dlat, dlng)
+        for g, (pickups, dropoffs) in enumerate(groups):
+            if loads[g][0] + seats > new_caps[0] or loads[g][1] + lug > new_caps[1]:
+                continue
+            if detour_ok(pickups, dropoffs, pickup, dropoff, tolerance):
+                pickups.append(pickup)
+                dropoffs.append(dropoff)
+                loads[g] = (loads[g][0] + seats, loads[g][1] + lug)
+                out.append((g, len(pickups)))
+                break
+        else:
+            groups.append(([pickup], [dropoff]))
+            loads.append((seats, lug))
+            out.append((len(groups) - 1, 1))
+    return out
+
+
+def _run_batch(batch, n, tolerance, new_caps=(4, 3)):
+    i = batch.match(0, tolerance)
+    while i < n:
+        batch.open_group(i, *new_caps)
+        i = batch.match(i + 1, tolerance)
+    return list(zip(batch.assignment.tolist(), batch.position.tolist()))
+
+
+class TestCellBatch:
+    def test_matches_detour_ok_reference(self):
+        rng = np.random.default_rng(3)
+        for _ in range(20):
+            n = int(rng.integers(1, 30))
+            rides = [
+                (
+                    19.09 + rng.normal(0, 0.02), 72.87 + rng.normal(0, 0.02),
+                    19.12 + rng.normal(0, 0.03), 72.85 + rng.normal(0, 0.03),
+                    int(rng.integers(1, 3)), int(rng.integers(0, 2)),
+                )
+                for _ in range(n)
+            ]
+            batch = CellBatch(rides, [])
+            assert _run_batch(batch, n, 0.4) == _greedy_reference(rides, 0.4)
+
+    def test_joins_existing_group_within_capacity(self):
+        existing = (4, 3, 1, 0, [(19.0896, 72.8656, 19.1176, 72.8490)])
+        rides = [
+            (19.0897, 72.8657, 19.1175, 72.8491, 2, 1),
+            (19.0897, 72.8657, 19.1175, 72.8491, 2, 1),  # would exceed 4 seats
+        ]
+        batch = CellBatch(rides, [existing])
+        assert batch.match(0, 0.4) == 1
+        assert batch.assignment[0] == 0
+        assert batch.position[0] == 2
+        assert batch.seats[0] == 3
 
 
 class TestSharedLeg:
     def test_single_passenger_equals_direct(self):
-        pickups = [(19.09, 72.87)]
-        dropoffs = [(19.12, 72.85)]
-        leg = _shared_leg(pickups, dropoffs, 0)
-        direct = haversine_km(19.09, 72.87, 19.12, 72.85)
-        assert abs(leg - direct) < 0.01
+        """An opened group's only leg is its direct distance, so an
+        identical ride joins it even with zero detour tolerance."""
+        ride = (19.09, 72.87, 19.12, 72.85, 1, 0)
+        batch = CellBatch([ride, ride], [])
+        assert batch.match(0, 0.0) == 0
+        batch.open_group(0, 4, 3)
+        assert batch.columns[7][0, 0] == pytest.approx(
+            haversine_km(19.09, 72.87, 19.12, 72.85), abs=0.01
+        )
+        assert batch.match(1, 0.0) == 2
+        assert batch.assignment[1] == 0
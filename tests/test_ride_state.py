@@ -3,7 +3,17 @@
 import pytest
 
 from src.domain.entities import Ride, InvalidStateTransition
-from src.domain.enums import RideStatus
+from src.domain.enums import CANCELLABLE_STATUSES, RideStatus
+
+# Every legal move; all other pairs must raise.  Notably, once on-trip a
+# ride can only complete -- not cancel -- and terminal states are final.
+_VALID = frozenset({
+    (RideStatus.PENDING, RideStatus.MATCHED),
+    (RideStatus.PENDING, RideStatus.CANCELLED),
+    (RideStatus.MATCHED, RideStatus.ON_TRIP),
+    (RideStatus.MATCHED, RideStatus.CANCELLED),
+    (RideStatus.ON_TRIP, RideStatus.COMPLETED),
+})
 
 
 class TestRideStateMachine:
@@ -11,52 +21,20 @@ class TestRideStateMachine:
         ride = Ride()
         assert ride.status == RideStatus.PENDING
 
-    # ── Valid transitions ─────────────────────────────────────────
-
-    def test_pending_to_matched(self):
-        ride = Ride(status=RideStatus.PENDING)
-        ride.transition_to(RideStatus.MATCHED)
-        assert ride.status == RideStatus.MATCHED
-
-    def test_pending_to_cancelled(self):
-        ride = Ride(status=RideStatus.PENDING)
-        ride.transition_to(RideStatus.CANCELLED)
-        assert ride.status == RideStatus.CANCELLED
-
-    def test_matched_to_on_trip(self):
-        ride = Ride(status=RideStatus.MATCHED)
-        ride.transition_to(RideStatus.ON_TRIP)
-        assert ride.status == RideStatus.ON_TRIP
-
-    def test_matched_to_cancelled(self):
-        ride = Ride(status=RideStatus.MATCHED)
-        ride.transition_to(RideStatus.CANCELLED)
-        assert ride.status == RideStatus.CANCELLED
-
-    def test_on_trip_to_completed(self):
-        ride = Ride(status=RideStatus.ON_TRIP)
-        ride.transition_to(RideStatus.COMPLETED)
-        assert ride.status == RideStatus.COMPLETED
-
-    # ── Invalid transitions ───────────────────────────────────────
-
-    def test_pending_to_completed_fails(self):
-        ride = Ride(status=RideStatus.PENDING)
-        with pytest.raises(InvalidStateTransition):
-            ride.transition_to(RideStatus.COMPLETED)
-
-    def test_completed_to_anything_fails(self):
-        ride = Ride(status=RideStatus.COMPLETED)
-        with pytest.raises(InvalidStateTransition):
-            ride.transition_to(RideStatus.PENDING)
-
-    def test_cancelled_to_anything_fails(self):
-        ride = Ride(status=RideStatus.CANCELLED)
-        with pytest.raises(InvalidStateTransition):
-            ride.transition_to(RideStatus.PENDING)
-
-    def test_on_trip_to_cancelled_fails(self):
-        """Once on-trip, can only complete -- not cancel."""
-        ride = Ride(status=RideStatus.ON_TRIP)
-        with pytest.raises(InvalidStateTransition):
-            ride.transition_to(RideStatus.CANCELLED)
+    @pytest.mark.parametrize(
+        "from_status, to_status",
+        [(s, d) for s in RideStatus for d in RideStatus if s != d],
+    )
+    def test_transition(self, from_status, to_status):
+        ride = Ride(status=from_status)
+        if (from_status, to_status) in _VALID:
+            ride.transition_to(to_status)
+            assert ride.status == to_status
+        else:
+            with pytest.raises(InvalidStateTransition):
+                ride.transition_to(to_status)
+
+    def test_cancellable_statuses_match_state_machine(self):
+        assert CANCELLABLE_STATUSES == {"PENDING", "MATCHED"}
+        assert RideStatus.MATCHED in CANCELLABLE_STATUSES
+        assert RideStatus.ON_TRIP not in CANCELLABLE_STATUSES